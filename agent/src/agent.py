@@ -10,19 +10,49 @@ This agent uses Pydantic AI framework with:
 
 import os
 import asyncio
+import inspect
 import logging
 import json
 import subprocess
+import tempfile
+import httpx
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
-from pydantic_ai.mcp import load_mcp_servers
+from pydantic_ai.mcp import MCPServerStdio
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.openai import OpenAIProvider
 from openai import AsyncOpenAI
-from tavily import TavilyClient
+from tavily_async import AsyncTavilySearch, TavilySearchError
+from search_cache import SearchCache, normalize_query
+from singleflight import SingleFlight
+from search_store import SearchStore
+from search_compaction import SearchCompactor
+from passage_extraction import PassageExtractor, RawContentPolicy
+from limits import ConcurrencyLimiter, OverloadedError, TokenBucket
+from hedging import Hedger
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from mcp_toolsets import (
+    CachedCatalogToolset, CircuitBreakerToolset, ManagedSessionToolset, MCPSessionManager, ResultCacheToolset,
+    LargeResultToolset, LimitedToolset, SwappableToolset, is_mcp_failure, server_name,
+)
+from mcp_result_cache import ToolResultCache
+from mcp_pool import StdioServerPool, clone_stdio_server
+from mcp_loader import build_mcp_server, build_mcp_servers
+from mcp_reload import MCPConfigReloader
+from result_store import ResultStore, query_result
+from tool_router import ToolRouter
+from llm_cache import ResponseCacheModel
+from prompt_cache import UsageTrackingModel, stable_tool_defs
+from model_router import ModelRouter
+from llm_http import LLMHttpClient
+from system_prompt import SystemPromptBuilder
+from mcp_supervisor import MCPSupervisor
 from dotenv import load_dotenv
+from starlette.responses import JSONResponse
+from starlette.routing import Route
 
 # Configure logging
 logging.basicConfig(
@@ -58,26 +88,115 @@ if missing_keys:
 
 logger.info("Environment variables loaded successfully")
 
-# Initialize Tavily client
-tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+# Initialize Tavily client (one pooled async HTTP client for the whole process)
+tavily_client = AsyncTavilySearch.from_env()
 logger.info("Tavily client initialized")
 
+# In-process cache of built search responses, keyed by normalized query
+search_cache = SearchCache(
+    max_size=int(os.getenv("SEARCH_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "900")),
+)
+logger.info(f"Search cache: {search_cache.max_size} entries, TTL {search_cache.ttl:.0f}s")
+
+# Optional SQLite store shared across workers and restarts (e.g. logs/search_cache.db)
+search_store = None
+if os.getenv("SEARCH_CACHE_DB_PATH"):
+    try:
+        search_store = SearchStore(
+            os.getenv("SEARCH_CACHE_DB_PATH"),
+            ttl=float(os.getenv("SEARCH_CACHE_DB_TTL", "3600")),
+            max_entries=int(os.getenv("SEARCH_CACHE_DB_MAX_ENTRIES", "5000")),
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to open persistent search cache: {type(e).__name__}: {e}")
+
+# Ranks, dedupes and trims result snippets to a token budget (0 disables)
+search_compactor = SearchCompactor(
+    token_budget=int(os.getenv("SEARCH_TOKEN_BUDGET", "1200")),
+    dedupe_threshold=float(os.getenv("SEARCH_DEDUPE_THRESHOLD", "0.8")),
+)
+
+# BM25 passage extraction from raw page content (0 passages disables raw content)
+passage_extractor = PassageExtractor(
+    passages_per_result=int(os.getenv("SEARCH_PASSAGES_PER_RESULT", "2")),
+    chunk_words=int(os.getenv("SEARCH_PASSAGE_WORDS", "60")),
+    min_score=float(os.getenv("SEARCH_PASSAGE_MIN_SCORE", "1.0")),
+)
+raw_content_policy = RawContentPolicy()
+
+# Coalesces concurrent identical searches into one Tavily request
+search_flights = SingleFlight()
+
+# Outbound Tavily admission control: concurrency + queue budget and plan rate limit
+search_limiter = ConcurrencyLimiter(
+    "Web search",
+    max_concurrency=int(os.getenv("TAVILY_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("TAVILY_MAX_QUEUE", "32")),
+    max_wait=float(os.getenv("TAVILY_MAX_QUEUE_WAIT", "10")),
+)
+search_rate_limiter = TokenBucket(
+    "Web search",
+    rate=float(os.getenv("TAVILY_RATE_LIMIT_PER_MINUTE", "100")) / 60,
+    capacity=float(os.getenv("TAVILY_RATE_LIMIT_BURST", "10")),
+    max_wait=float(os.getenv("TAVILY_MAX_QUEUE_WAIT", "10")),
+)
+
+# Per-call deadline with optional p95 hedging and a basic-depth fallback on timeout
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "15"))
+SEARCH_FALLBACK_DEADLINE = float(os.getenv("SEARCH_FALLBACK_DEADLINE", "5"))
+SEARCH_DEGRADED_CACHE_TTL = float(os.getenv("SEARCH_DEGRADED_CACHE_TTL", "60"))
+search_hedger = Hedger(enabled=os.getenv("SEARCH_HEDGING", "true").lower() == "true")
+search_deadline_stats = {"timeouts": 0, "fallbacks": 0}
+
+# Fan-out limits for tavily_search_many
+SEARCH_MANY_MAX_QUERIES = int(os.getenv("SEARCH_MANY_MAX_QUERIES", "5"))
+SEARCH_MANY_CONCURRENCY = int(os.getenv("SEARCH_MANY_CONCURRENCY", "3"))
+
+# Circuit breakers for external dependencies, keyed by dependency name
+CIRCUIT_SETTINGS = dict(
+    failure_rate_threshold=float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+    min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "5")),
+    cooldown=float(os.getenv("CIRCUIT_COOLDOWN", "30")),
+)
+
+
+def is_tavily_failure(error: BaseException) -> bool:
+    """Whether a search error counts against Tavily's health (not local rejections or bad queries)"""
+    if isinstance(error, OverloadedError):
+        return False
+    if isinstance(error, TavilySearchError) and error.status_code in (400, 422):
+        return False
+    return True
+
+
+tavily_breaker = CircuitBreaker("Web search", is_failure=is_tavily_failure, **CIRCUIT_SETTINGS)
+circuit_breakers = {"tavily": tavily_breaker}
+
+# Default bound on each MCP server's startup, including its initialize handshake
+MCP_STARTUP_TIMEOUT = float(os.getenv("MCP_STARTUP_TIMEOUT", "30"))
+
 # Load MCP servers from configuration
 def load_mcp_config(config_path: str = "mcp_config.json"):
-    """Load MCP server configuration from JSON file with robust error handling"""
+    """Load MCP server configuration from JSON file with robust error handling
+    
+    Returns the MCP servers, each server's raw config entry (which may carry
+    agent-side options such as "pool", "cache" or "lazy") and the path that
+    was used.
+    """
     try:
         if os.path.exists(config_path):
             logger.info(f"Loading MCP configuration from {config_path}")
             
-            # First, validate the JSON structure
+            # Parse the JSON once and build the servers from it
             with open(config_path, 'r') as f:
                 config_data = json.load(f)
                 logger.info(f"Found {len(config_data.get('mcpServers', {}))} MCP server definitions")
             
-            # Try to load the MCP servers
-            mcp_servers = load_mcp_servers(config_path)
+            server_configs = config_data.get("mcpServers", {})
+            mcp_servers = build_mcp_servers(server_configs, startup_timeout=MCP_STARTUP_TIMEOUT)
             logger.info(f"✅ Successfully loaded {len(mcp_servers)} MCP servers")
-            return mcp_servers
+            return mcp_servers, server_configs, config_path
         else:
             logger.warning(f"MCP config file {config_path} not found")
             # Try the minimal config as fallback
@@ -85,66 +204,269 @@ def load_mcp_config(config_path: str = "mcp_config.json"):
                 logger.info("Trying minimal config as fallback...")
                 return load_mcp_config("mcp_config_minimal.json")
             logger.warning("No MCP config found, proceeding with Tavily search only")
-            return []
+            return [], {}, config_path
     except FileNotFoundError as e:
         logger.error(f"❌ MCP config file not found: {e}")
-        return []
+        return [], {}, config_path
     except json.JSONDecodeError as e:
         logger.error(f"❌ Invalid JSON in MCP config: {e}")
-        return []
+        return [], {}, config_path
     except ImportError as e:
         logger.error(f"❌ MCP dependencies not installed: {e}")
         logger.info("Install with: pip install 'pydantic-ai[mcp]'")
-        return []
+        return [], {}, config_path
     except subprocess.CalledProcessError as e:
         logger.error(f"❌ MCP server subprocess failed: {e}")
         logger.info("Check that required tools (uvx, npx, deno) are installed")
-        return []
+        return [], {}, config_path
     except Exception as e:
         logger.error(f"❌ Failed to load MCP configuration: {type(e).__name__}: {e}")
         logger.info("Continuing with Tavily search only...")
-        return []
+        return [], {}, config_path
 
 # Load MCP servers
-mcp_servers = load_mcp_config()
+mcp_servers, mcp_server_configs, mcp_config_path = load_mcp_config()
+
+
+def prepare_mcp_server(server, config):
+    """Run a stdio server that asks for a "pool" as a pool of warm worker processes"""
+    pool_config = config.get("pool")
+    if not (pool_config and isinstance(server, MCPServerStdio)):
+        return server
+    pool = StdioServerPool(
+        server_name(server),
+        factory=lambda: clone_stdio_server(server),
+        size=int(pool_config.get("size", 2)),
+        max_calls=int(pool_config.get("maxCalls", 500)),
+        max_rss_mb=pool_config.get("maxRssMb"),
+        health_interval=float(pool_config.get("healthInterval", 30)),
+    )
+    logger.info(f"🔌 MCP server '{server_name(server)}' will run as a pool of {pool.size} processes")
+    return pool
+
+
+mcp_servers = [prepare_mcp_server(server, mcp_server_configs.get(server_name(server), {})) for server in mcp_servers]
+
+# MCP sessions are opened once and shared by all runs: eager servers start
+# concurrently in the app lifespan, lazy ones on first use
+MCP_LAZY_START = os.getenv("MCP_LAZY_START", "false").lower() == "true"
+mcp_sessions = MCPSessionManager(startup_timeout=MCP_STARTUP_TIMEOUT)
+
+# Probe MCP servers periodically; unhealthy ones are hidden and restarted with backoff
+mcp_supervisor = MCPSupervisor(
+    mcp_sessions,
+    interval=float(os.getenv("MCP_HEALTH_INTERVAL", "15")),
+    probe_timeout=float(os.getenv("MCP_HEALTH_TIMEOUT", "5")),
+    failure_threshold=int(os.getenv("MCP_HEALTH_FAILURES", "2")),
+    backoff=float(os.getenv("MCP_RESTART_BACKOFF", "1")),
+    max_backoff=float(os.getenv("MCP_RESTART_BACKOFF_MAX", "60")),
+)
+
+mcp_catalogs = {}
+mcp_result_caches = {}
+mcp_large_results = {}
+mcp_limits = {}
+
+# Per-server defaults for concurrent calls, queueing and call timeouts
+# (overridden by a server's "limits" block in mcp_config.json)
+MCP_LIMIT_DEFAULTS = {
+    "maxConcurrency": int(os.getenv("MCP_MAX_CONCURRENCY", "8")),
+    "maxQueue": int(os.getenv("MCP_MAX_QUEUE", "32")),
+    "maxQueueWait": float(os.getenv("MCP_MAX_QUEUE_WAIT", "10")),
+    "callTimeout": float(os.getenv("MCP_CALL_TIMEOUT", "120")),
+}
+
+# Oversized MCP tool results are kept out of the model context; the model pages
+# through them with mcp_result_query instead
+MCP_RESULT_MAX_CHARS = int(os.getenv("MCP_RESULT_MAX_CHARS", "20000"))
+mcp_result_store = ResultStore(
+    max_memory_bytes=int(float(os.getenv("MCP_RESULT_STORE_MEMORY_MB", "32")) * 1024 * 1024),
+    spill_dir=os.getenv("MCP_RESULT_SPILL_DIR", os.path.join(tempfile.gettempdir(), "mcp_results")),
+    max_disk_bytes=int(float(os.getenv("MCP_RESULT_STORE_DISK_MB", "256")) * 1024 * 1024),
+    ttl=float(os.getenv("MCP_RESULT_STORE_TTL", "3600")),
+)
+
+
+def add_mcp_server(server, config):
+    """Register an MCP server with the session manager and build the toolset the agent uses
+
+    The server's tool catalog is cached, calls are bounded by its own
+    concurrency limit and timeouts and guarded by its own circuit breaker,
+    read-only tool results are cached briefly if configured, and oversized
+    results are handed to the model as a handle.
+    """
+    name = server_name(server)
+    mcp_sessions.add_server(server, lazy=config.get("lazy", MCP_LAZY_START), startup_timeout=config.get("startupTimeout"))
+    catalog = CachedCatalogToolset(server)
+    mcp_catalogs[name] = catalog
+    breaker = CircuitBreaker(f"MCP server '{name}'", is_failure=is_mcp_failure, **CIRCUIT_SETTINGS)
+    circuit_breakers[f"mcp:{name}"] = breaker
+    limits = {**MCP_LIMIT_DEFAULTS, **config.get("limits", {})}
+    mcp_limits[name] = LimitedToolset(
+        catalog,
+        limiter=ConcurrencyLimiter(
+            f"MCP server '{name}'",
+            max_concurrency=int(limits["maxConcurrency"]),
+            max_queue=int(limits["maxQueue"]),
+            max_wait=float(limits["maxQueueWait"]),
+        ),
+        timeout=float(limits["callTimeout"]),
+        tool_timeouts={pattern: float(timeout) for pattern, timeout in limits.get("toolTimeouts", {}).items()},
+        tool_prefix=getattr(server, "tool_prefix", None),
+    )
+    toolset = CircuitBreakerToolset(mcp_limits[name], breaker=breaker)
+    # Short-lived read-through cache for the server's read-only tools, if configured
+    cache_config = config.get("cache")
+    if cache_config:
+        mcp_result_caches[name] = ToolResultCache.from_config(name, cache_config, tool_prefix=getattr(server, "tool_prefix", None))
+        toolset = ResultCacheToolset(toolset, cache=mcp_result_caches[name])
+    toolset = LargeResultToolset(
+        toolset, store=mcp_result_store, max_chars=int(config.get("maxResultChars", MCP_RESULT_MAX_CHARS))
+    )
+    mcp_large_results[name] = toolset
+    # Starts lazy servers and hides the tools of servers the supervisor finds unhealthy
+    return ManagedSessionToolset(toolset, sessions=mcp_sessions)
+
+
+def build_reloaded_mcp_server(name, config):
+    """Build a server added or changed by a config reload; None if its entry is broken"""
+    try:
+        server = prepare_mcp_server(build_mcp_server(name, config, startup_timeout=MCP_STARTUP_TIMEOUT), config)
+    except Exception as e:
+        logger.error(f"❌ Skipping MCP server '{name}': {type(e).__name__}: {e}")
+        return None
+    return add_mcp_server(server, config)
+
+
+def forget_mcp_server(name):
+    """Drop the per-server metrics of a server removed by a config reload"""
+    mcp_catalogs.pop(name, None)
+    mcp_result_caches.pop(name, None)
+    mcp_large_results.pop(name, None)
+    mcp_limits.pop(name, None)
+    circuit_breakers.pop(f"mcp:{name}", None)
+
+
+mcp_server_toolsets = {
+    server_name(server): add_mcp_server(server, mcp_server_configs.get(server_name(server), {}))
+    for server in mcp_servers
+}
+# Runs are pinned to the toolset generation they started with, so reloads can swap it
+mcp_toolsets = SwappableToolset(list(mcp_server_toolsets.values()))
+
+# Watch the config file and apply server changes without a restart
+mcp_reloader = MCPConfigReloader(
+    mcp_config_path,
+    configs={name: mcp_server_configs[name] for name in mcp_server_toolsets},
+    toolsets=mcp_server_toolsets,
+    registry=mcp_toolsets,
+    sessions=mcp_sessions,
+    build=build_reloaded_mcp_server,
+    forget=forget_mcp_server,
+    interval=float(os.getenv("MCP_CONFIG_RELOAD_INTERVAL", "5")),
+    drain_timeout=float(os.getenv("MCP_DRAIN_TIMEOUT", "300")),
+)
 
 # Log loaded MCP servers
 if mcp_servers:
     logger.info("🔧 Available MCP toolsets:")
     for i, server in enumerate(mcp_servers, 1):
-        server_name = getattr(server, '_name', server.__class__.__name__)
-        logger.info(f"  {i}. {server_name}")
+        logger.info(f"  {i}. {server_name(server)}")
 else:
     logger.info("📝 No MCP servers loaded - only Tavily search will be available")
 
 
-# Initialize the model (LLM Farm or OpenAI)
-def initialize_model():
-    """Initialize the AI model based on configuration"""
+# One pooled HTTP client for the LLM provider, shared by both model tiers
+llm_http = LLMHttpClient.from_env("LLM Farm" if use_llm_farm else "OpenAI")
+# Provider clients whose connections are opened at startup with an authenticated GET /models
+llm_clients = []
+LLM_PREWARM_CONNECTIONS = int(os.getenv("LLM_PREWARM_CONNECTIONS", "2"))
+
+
+# Initialize the models (LLM Farm or OpenAI): a fast tier and a strong tier
+def build_model(model_name: str, deployment_url: Optional[str] = None):
+    """One chat model on the configured provider (LLM Farm deployments are addressed by URL)"""
     if use_llm_farm:
-        logger.info("🔧 Configuring LLM Farm client...")
-        
         # Configure AsyncOpenAI client for LLM Farm
         llm_client = AsyncOpenAI(
-            base_url=llm_farm_url,
+            base_url=deployment_url,
             api_key="dummy",  # LLM Farm doesn't use standard API key
             default_headers={"genaiplatform-farm-subscription-key": os.getenv("LLM_FARM_API_KEY")},
-            default_query={"api-version": "2024-08-01-preview"}
+            default_query={"api-version": "2024-08-01-preview"},
+            http_client=llm_http.client,
         )
-        
-        # Create Pydantic AI model with custom client
-        model = OpenAIChatModel(
-            model_name="gpt-4o-mini",
-            provider=OpenAIProvider(openai_client=llm_client)
-        )
-        
-        logger.info(f"✓ LLM Farm client configured: {llm_farm_url}")
-        return model
-    else:
-        logger.info("✓ Using standard OpenAI API: gpt-4o-mini")
-        return "openai:gpt-4o-mini"
+        llm_clients.append(llm_client)
+        return OpenAIChatModel(model_name=model_name, provider=OpenAIProvider(openai_client=llm_client))
+    provider = OpenAIProvider(http_client=llm_http.client)
+    llm_clients.append(provider.client)
+    return OpenAIChatModel(model_name=model_name, provider=provider)
 
-model = initialize_model()
+
+def initialize_models():
+    """(fast model, strong model); the same model twice when only one is configured"""
+    if use_llm_farm:
+        logger.info("🔧 Configuring LLM Farm client...")
+        fast = build_model(os.getenv("LLM_FARM_FAST_MODEL", "gpt-4o-mini"), llm_farm_url)
+        logger.info(f"✓ LLM Farm fast tier: {fast.model_name} at {llm_farm_url}")
+        strong_url = os.getenv("LLM_FARM_STRONG_URL")
+        if not strong_url:
+            return fast, fast
+        strong = build_model(os.getenv("LLM_FARM_MODEL", "gpt-4o"), strong_url)
+        logger.info(f"✓ LLM Farm strong tier: {strong.model_name} at {strong_url}")
+        return fast, strong
+    fast = build_model(os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini"))
+    # The strong tier is opt-in: without OPENAI_STRONG_MODEL every request uses the fast model
+    strong_name = os.getenv("OPENAI_STRONG_MODEL")
+    if not strong_name or strong_name == fast.model_name:
+        logger.info(f"✓ Using standard OpenAI API: {fast.model_name}")
+        return fast, fast
+    strong = build_model(strong_name)
+    logger.info(f"✓ Using standard OpenAI API: {fast.model_name} (fast), {strong.model_name} (strong)")
+    return fast, strong
+
+fast_model, strong_model = initialize_models()
+
+# Record provider-reported usage (including prompt-cache hits) per model
+model_usage = {}
+
+# Cheap turns (tool selection, argument retries, short answers) go to the fast
+# model, long synthesis to the strong one
+MODEL_ROUTER_ENABLED = os.getenv("MODEL_ROUTER_ENABLED", "true").lower() == "true"
+model_router = None
+if MODEL_ROUTER_ENABLED and fast_model.model_name != strong_model.model_name:
+    model_router = ModelRouter(
+        UsageTrackingModel(fast_model, usage=model_usage),
+        UsageTrackingModel(strong_model, usage=model_usage),
+        synthesis_chars=int(os.getenv("MODEL_ROUTER_SYNTHESIS_CHARS", "6000")),
+        long_prompt_chars=int(os.getenv("MODEL_ROUTER_LONG_PROMPT_CHARS", "1500")),
+    )
+    model = model_router
+    logger.info(f"🔀 Model router: {fast_model.model_name} (fast) / {strong_model.model_name} (strong)")
+else:
+    model = UsageTrackingModel(fast_model, usage=model_usage)
+    logger.info(f"🔀 Model router disabled: all requests use {fast_model.model_name}")
+
+# Opt-in exact-match cache of text-only model responses (memory, optionally backed by SQLite)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+llm_cache_model = None
+if LLM_CACHE_ENABLED:
+    llm_cache_db_path = os.getenv("LLM_CACHE_DB_PATH")
+    llm_cache_model = ResponseCacheModel(
+        model,
+        cache=SearchCache(
+            max_size=int(os.getenv("LLM_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+        ),
+        store=SearchStore(
+            llm_cache_db_path,
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+            max_entries=int(os.getenv("LLM_CACHE_DB_MAX_ENTRIES", "5000")),
+            label="LLM response store",
+        ) if llm_cache_db_path else None,
+    )
+    model = llm_cache_model
+    logger.info(f"✓ LLM response cache enabled (TTL {llm_cache_model.cache.ttl:g}s"
+                f"{', persisted to ' + llm_cache_db_path if llm_cache_db_path else ''})")
 
 
 class SearchResult(BaseModel):
@@ -153,6 +475,7 @@ class SearchResult(BaseModel):
     url: str = Field(description="URL of the search result")
     content: str = Field(description="Content snippet from the search result")
     score: float = Field(description="Relevance score of the result")
+    passages: List[str] = Field(default_factory=list, description="Query-relevant passages extracted from the full page")
 
 
 class SearchResponse(BaseModel):
@@ -160,73 +483,179 @@ class SearchResponse(BaseModel):
     query: str = Field(description="The search query that was executed")
     results: List[SearchResult] = Field(description="List of search results")
     answer: Optional[str] = Field(description="AI-generated answer based on search results")
+    error: Optional[Dict[str, Any]] = Field(
+        default=None, description="Why the search did not run, e.g. an open circuit with retry_after seconds"
+    )
+
+
+class MultiSearchResponse(BaseModel):
+    """Merged response from several search operations"""
+    queries: List[str] = Field(description="The search queries that were executed")
+    results: List[SearchResult] = Field(description="Search results from all queries, deduplicated by URL")
+    answers: Dict[str, str] = Field(default_factory=dict, description="AI-generated answer per query")
+    errors: Dict[str, Union[str, Dict[str, Any]]] = Field(
+        default_factory=dict, description="Error per failed query (structured, with retry_after, for an open circuit)"
+    )
+
+
+# Send only the tools relevant to the conversation (falls back to all tools). The subset only grows
+# within a conversation so the prompt cache prefix survives the tool calls of each prompt
+tool_router = ToolRouter(
+    always=["mcp_result_query"],
+    top_k=int(os.getenv("TOOL_ROUTER_TOP_K", "8")),
+    min_score=float(os.getenv("TOOL_ROUTER_MIN_SCORE", "1.0")),
+    enabled=os.getenv("TOOL_ROUTER_ENABLED", "true").lower() == "true",
+)
+
+async def prepare_tools(ctx, tool_defs):
+    """Route tools for this request, then fix their order and schema layout
+
+    A byte-stable tool block keeps the provider's prompt cache prefix intact.
+    """
+    return stable_tool_defs(await tool_router.prepare_tools(ctx, tool_defs))
 
 
 # Initialize the Pydantic AI agent with MCP servers
 agent = Agent(
     model,
-    system_prompt="""
-    You are a helpful AI assistant with access to multiple tools. Choose the appropriate tool based on the user's request:
+    toolsets=[mcp_toolsets],  # Add MCP servers as toolsets
+    prepare_tools=prepare_tools,
+)
+
+
+def loaded_mcp_servers():
+    """(name, config entry) of every loaded MCP server whose tools are currently offered"""
+    return [
+        (name, mcp_reloader.configs.get(name, {}))
+        for name in mcp_sessions.servers if mcp_sessions.available(name)
+    ]
+
+
+@agent.system_prompt
+def system_prompt() -> str:
+    """Tool guidelines for the MCP servers that are actually loaded"""
+    return system_prompt_builder.prompt(loaded_mcp_servers())
+
+
+# Build (and log the size of) the prompt for the servers loaded at startup
+system_prompt_builder = SystemPromptBuilder()
+system_prompt_builder.prompt(loaded_mcp_servers())
+
+logger.info(f"🤖 Pydantic AI agent initialized with {model.model_name}"
+            f"{f' (escalating to {strong_model.model_name})' if model_router is not None else ''}")
+logger.info(f"🔧 Total toolsets available: {len(mcp_servers) + 1} (Tavily + {len(mcp_servers)} MCP servers)")
+
+
+async def tavily_request(query: str, search_depth: str, include_raw_content: bool, timeout: float) -> dict:
+    """One admitted Tavily API call"""
+    # Admission control: bounded concurrency/queue, then the plan's rate limit
+    async with search_limiter.slot():
+        await search_rate_limiter.acquire()
+        return await tavily_client.search(
+            query=query,
+            search_depth=search_depth,
+            include_answer=True,
+            max_results=5,
+            include_raw_content=include_raw_content,
+            timeout=timeout
+        )
+
+
+async def run_tavily_search(query: str, request_id: str) -> Tuple[SearchResponse, bool]:
+    """Execute a Tavily search and build the SearchResponse (raises on failure)
     
-    **Tool Selection Guidelines:**
+    Returns the response and whether it is a degraded basic-depth fallback.
+    """
+    include_raw_content = passage_extractor.enabled and raw_content_policy.should_request(query)
+    logger.info(f"[{request_id}] Executing Tavily search (raw content: {include_raw_content})...")
+    degraded = False
+    try:
+        # Bound the whole call, hedging with a second request once it is slower than p95
+        search_result = await asyncio.wait_for(
+            search_hedger.run(lambda: tavily_request(query, "advanced", include_raw_content, SEARCH_DEADLINE)),
+            timeout=SEARCH_DEADLINE
+        )
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        search_deadline_stats["timeouts"] += 1
+        logger.warning(f"[{request_id}] ⏱️ Advanced search exceeded {SEARCH_DEADLINE:g}s, falling back to basic search")
+        include_raw_content = False
+        degraded = True
+        search_result = await asyncio.wait_for(
+            tavily_request(query, "basic", False, SEARCH_FALLBACK_DEADLINE),
+            timeout=SEARCH_FALLBACK_DEADLINE
+        )
+        search_deadline_stats["fallbacks"] += 1
     
-    1. **Web Search (tavily_search)** - Use when the user wants to SEARCH for information:
-       - Keywords: "search", "find", "look up", "what's happening", "latest news", "research"
-       - Examples: "Search for latest AI developments", "Find information about...", "What's new in..."
-       - Use for: Current events, news, research topics, general information discovery
+    logger.info(f"[{request_id}] Tavily search completed successfully")
+    logger.info(f"[{request_id}] Found {len(search_result.get('results', []))} results")
     
-    2. **Kubernetes & Helm Operations (MCP)** - Use when the user wants to interact with Kubernetes or Helm:
-       
-       **Kubernetes Operations:**
-       - Keywords: "kubectl", "kubernetes", "k8s", "pods", "services", "deployments", "namespaces", "CRDs", "custom resources"
-       - Resource Management: Query supported resource types (built-in and custom resources)
-       - Read Operations: get resource details, list resources with filtering, describe resources
-       - Write Operations: create, update, delete resources (fine-grained control available)
-       - Examples: "Get pods in namespace", "List deployments", "Describe service", "Create configmap", "Delete pod"
-       - Supports: All Kubernetes resource types including custom resources, namespace filtering
-       
-       **Helm Operations:**
-       - Keywords: "helm", "charts", "releases", "repositories", "install", "upgrade", "uninstall"
-       - Release Management: list, get, install, upgrade, uninstall Helm releases
-       - Repository Management: list, add, remove Helm repositories
-       - Examples: "List helm releases", "Install chart", "Upgrade release", "Add helm repo"
-       - Fine-grained control: Each operation can be independently enabled/disabled
-       
-       **Connection:** Uses kubeconfig for cluster authentication
+    raw_results = search_result.get("results", [])
+    passages = [[] for _ in raw_results]
+    if include_raw_content:
+        # Keep only the parts of each full page that match the query
+        passages = passage_extractor.extract(query, [r.get("raw_content") or "" for r in raw_results])
+        useful = any(passages)
+        raw_content_policy.record(query, useful)
+        logger.info(f"[{request_id}] Extracted {sum(len(p) for p in passages)} passages from raw content (useful: {useful})")
     
-    3. **Fetch Tool (MCP)** - Use when the user wants to FETCH content from a specific URL:
-       - Keywords: "fetch", "get content from", "retrieve from URL", "download", "scrape"
-       - Examples: "Fetch content from https://...", "Get the content of this webpage", "Retrieve data from..."
-       - Use for: Getting specific webpage content, downloading data from URLs
+    # Process the results
+    results = []
+    for i, result in enumerate(raw_results):
+        search_res = SearchResult(
+            title=result.get("title", ""),
+            url=result.get("url", ""),
+            content=result.get("content", ""),
+            score=result.get("score", 0.0),
+            passages=passages[i]
+        )
+        results.append(search_res)
+        logger.debug(f"[{request_id}] Result {i+1}: {result.get('title', 'No title')} - {result.get('url', 'No URL')}")
     
-    4. **Direct LLM Response** - Use when the request doesn't involve search, fetch, Kubernetes, or Helm:
-       - General questions, explanations, analysis of provided text
-       - Math problems, coding help, creative writing, advice
-       - Processing or analyzing content the user has already provided
-       - Examples: "Explain how...", "Write a story about...", "Calculate...", "Help me understand..."
+    if search_result.get("answer"):
+        logger.info(f"[{request_id}] AI Answer available: {search_result.get('answer')[:100]}...")
     
-    **Additional MCP Tools** (if available):
-    - Python code execution for calculations and data processing
-    - Memory storage for remembering information across conversations
-    - File operations for saving/loading data
-    - GitHub operations for repository management
+    # Fit the snippets into the token budget before they reach the model
+    results, tokens_saved = search_compactor.compact(results)
+    if tokens_saved:
+        logger.info(f"[{request_id}] ✂️ Compacted results to {len(results)} snippets, saved ~{tokens_saved} tokens")
     
-    **Instructions:**
-    - Always choose the most appropriate tool based on the user's intent
-    - For search requests: Use tavily_search and provide comprehensive results with citations
-    - For Kubernetes/Helm requests: Use the appropriate MCP tools for cluster and Helm operations
-    - For fetch requests: Use the MCP fetch tool to retrieve specific URL content
-    - For general questions: Respond directly using your knowledge without tools
-    - Be conversational, helpful, and thorough in your responses
-    - If uncertain about tool choice, ask the user to clarify their intent
-    - When using Kubernetes tools, specify namespace when needed (default to 'default' if not specified)
-    - For Helm operations, consider asking for release names, chart names, or repository details as needed
-    """,
-    toolsets=mcp_servers,  # Add MCP servers as toolsets
-)
-
-logger.info(f"🤖 Pydantic AI agent initialized with GPT-4o-mini")
-logger.info(f"🔧 Total toolsets available: {len(mcp_servers) + 1} (Tavily + {len(mcp_servers)} MCP servers)")
+    response = SearchResponse(
+        query=query,
+        results=results,
+        answer=search_result.get("answer", "")
+    )
+    return response, degraded
+
+
+async def cached_search(query: str, request_id: str) -> SearchResponse:
+    """Search through the memory cache, single-flight and persistent store (raises on failure)"""
+    cached = search_cache.get(query)
+    if cached is not None:
+        logger.info(f"[{request_id}] ⚡ Cache hit for '{normalize_query(query)}' ({search_cache.hits} hits / {search_cache.misses} misses)")
+        return cached
+    
+    async def fetch_and_cache() -> SearchResponse:
+        key = normalize_query(query)
+        if search_store is not None:
+            payload = await search_store.get(key)
+            if payload is not None:
+                logger.info(f"[{request_id}] 💾 Persistent cache hit for '{key}'")
+                response = SearchResponse.model_validate_json(payload)
+                search_cache.set(query, response)
+                return response
+        
+        response, degraded = await tavily_breaker.call(lambda: run_tavily_search(query, request_id))
+        if degraded:
+            # Keep basic-depth fallbacks only briefly and never persist them
+            search_cache.set(query, response, ttl=SEARCH_DEGRADED_CACHE_TTL)
+            return response
+        search_cache.set(query, response)
+        if search_store is not None:
+            await search_store.set(key, response.model_dump_json())
+        return response
+    
+    # Concurrent identical queries share one upstream request
+    return await search_flights.do(normalize_query(query), fetch_and_cache)
 
 
 @agent.tool_plain
@@ -245,46 +674,15 @@ async def tavily_search(query: str) -> SearchResponse:
     logger.info(f"[{request_id}] Query: '{query}'")
     
     try:
-        # Run the synchronous tavily search in a thread pool
-        logger.info(f"[{request_id}] Executing Tavily search...")
-        loop = asyncio.get_event_loop()
-        search_result = await loop.run_in_executor(
-            None,
-            lambda: tavily_client.search(
-                query=query,
-                search_depth="advanced",
-                include_answer=True,
-                max_results=5,
-                include_raw_content=True
-            )
-        )
-        
-        logger.info(f"[{request_id}] Tavily search completed successfully")
-        logger.info(f"[{request_id}] Found {len(search_result.get('results', []))} results")
-        
-        # Process the results
-        results = []
-        for i, result in enumerate(search_result.get("results", [])):
-            search_res = SearchResult(
-                title=result.get("title", ""),
-                url=result.get("url", ""),
-                content=result.get("content", ""),
-                score=result.get("score", 0.0)
-            )
-            results.append(search_res)
-            logger.debug(f"[{request_id}] Result {i+1}: {result.get('title', 'No title')} - {result.get('url', 'No URL')}")
-        
-        response = SearchResponse(
-            query=query,
-            results=results,
-            answer=search_result.get("answer", "")
-        )
-        
-        logger.info(f"[{request_id}] ✅ TOOL SUCCESS: tavily_search returned {len(results)} results")
-        if search_result.get("answer"):
-            logger.info(f"[{request_id}] AI Answer available: {search_result.get('answer')[:100]}...")
+        response = await cached_search(query, request_id)
         
+        logger.info(f"[{request_id}] ✅ TOOL SUCCESS: tavily_search returned {len(response.results)} results")
         return response
+    
+    except CircuitOpenError as e:
+        # Same shape as the MCP tools' open-circuit error, so the model waits before retrying
+        logger.warning(f"[{request_id}] ⛔ tavily_search short-circuited: {e}")
+        return SearchResponse(query=query, results=[], answer=None, error=e.to_dict())
         
     except Exception as e:
         logger.error(f"[{request_id}] ❌ TOOL ERROR: tavily_search failed with error: {str(e)}")
@@ -301,8 +699,188 @@ async def tavily_search(query: str) -> SearchResponse:
         return error_response
 
 
+@agent.tool_plain
+async def tavily_search_many(queries: List[str]) -> MultiSearchResponse:
+    """
+    Search the web for several related queries at once.
+    
+    Prefer this over repeated tavily_search calls when a question needs
+    more than one search (e.g. comparing topics or researching sub-questions).
+    
+    Args:
+        queries: The search queries to execute (up to 5)
+        
+    Returns:
+        MultiSearchResponse with merged results, per-query answers and per-query errors
+    """
+    request_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    logger.info(f"[{request_id}] 🔍 TOOL CALLED: tavily_search_many")
+    
+    # Drop empty and duplicate queries while keeping the model's order
+    unique_queries = []
+    seen = set()
+    for query in queries:
+        key = normalize_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            unique_queries.append(query)
+    unique_queries = unique_queries[:SEARCH_MANY_MAX_QUERIES]
+    logger.info(f"[{request_id}] Queries: {unique_queries}")
+    
+    semaphore = asyncio.Semaphore(SEARCH_MANY_CONCURRENCY)
+    
+    async def search_one(query: str) -> SearchResponse:
+        async with semaphore:
+            return await cached_search(query, request_id)
+    
+    outcomes = await asyncio.gather(*(search_one(q) for q in unique_queries), return_exceptions=True)
+    
+    merged = {}
+    answers = {}
+    errors = {}
+    for query, outcome in zip(unique_queries, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"[{request_id}] ❌ Query '{query}' failed: {type(outcome).__name__}: {outcome}")
+            errors[query] = outcome.to_dict() if isinstance(outcome, CircuitOpenError) else f"Search failed: {outcome}"
+            continue
+        if outcome.answer:
+            answers[query] = outcome.answer
+        for result in outcome.results:
+            # Deduplicate by URL, keeping the best-scored copy
+            existing = merged.get(result.url)
+            if existing is None or result.score > existing.score:
+                merged[result.url] = result
+    
+    results, tokens_saved = search_compactor.compact(list(merged.values()))
+    logger.info(f"[{request_id}] ✅ TOOL SUCCESS: tavily_search_many returned {len(results)} unique results "
+                f"({len(errors)} of {len(unique_queries)} queries failed, saved ~{tokens_saved} tokens)")
+    
+    return MultiSearchResponse(
+        queries=unique_queries,
+        results=results,
+        answers=answers,
+        errors=errors
+    )
+
+
+@agent.tool_plain
+async def mcp_result_query(
+    handle: str,
+    offset: int = 0,
+    limit: int = 50,
+    contains: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Read a large tool result that was returned as a handle instead of in full.
+    
+    Results are split into records (JSON list items, or lines of text) that
+    can be paged, filtered and reduced to the fields you need.
+    
+    Args:
+        handle: The handle from the truncated tool result (e.g. "res_1a2b3c4d5e6f7a8b")
+        offset: Index of the first matching record to return
+        limit: Maximum number of records to return
+        contains: Only return records containing this text (case-insensitive)
+        fields: Dotted field paths to keep from each JSON record, e.g. ["metadata.name", "status.phase"]
+        
+    Returns:
+        The matching record count, the requested page of records and the offset of the next page
+    """
+    logger.info(f"📦 TOOL CALLED: mcp_result_query handle={handle} offset={offset} limit={limit} contains={contains!r} fields={fields}")
+    stored = await mcp_result_store.get(handle)
+    if stored is None:
+        return {"error": f"Unknown or expired result handle '{handle}'. Run the original tool again."}
+    # Pages are as large as the owning server's maxResultChars allows
+    text, page_chars = stored
+    page = query_result(text, offset=offset, limit=limit, contains=contains, fields=fields,
+                        max_chars=page_chars or MCP_RESULT_MAX_CHARS)
+    return {"handle": handle, **page}
+
+
+async def tools_endpoint(request):
+    """Built-in tools and the cached tool catalog of every MCP server"""
+    builtin = [
+        {"name": tool.__name__, "description": inspect.getdoc(tool)}
+        for tool in (tavily_search, tavily_search_many, mcp_result_query)
+    ]
+    servers = {}
+    # Snapshot: a config reload may change the servers while catalogs load
+    for name, catalog in list(mcp_catalogs.items()):
+        try:
+            servers[name] = {"tools": await catalog.catalog()}
+        except Exception as e:
+            logger.error(f"❌ Failed to list tools of MCP server '{name}': {type(e).__name__}: {e}")
+            servers[name] = {"tools": [], "error": f"{type(e).__name__}: {e}"}
+    return JSONResponse({"builtin": builtin, "mcp": servers})
+
+
+async def metrics_endpoint(request):
+    """Runtime counters for caches, limiters and outbound search"""
+    metrics = {
+        "search": {
+            "cache": search_cache.stats(),
+            "persistent_cache": search_store.stats() if search_store is not None else None,
+            "single_flight": search_flights.stats(),
+            "compaction": search_compactor.stats(),
+            "raw_content": raw_content_policy.stats(),
+            "concurrency": search_limiter.stats(),
+            "rate_limit": search_rate_limiter.stats(),
+            "hedging": search_hedger.stats(),
+            "deadlines": {"deadline": SEARCH_DEADLINE, **search_deadline_stats},
+        },
+        "circuits": {name: breaker.stats() for name, breaker in circuit_breakers.items()},
+        "system_prompt": system_prompt_builder.stats(),
+        "tool_router": tool_router.stats(),
+        "llm_cache": llm_cache_model.stats() if llm_cache_model is not None else None,
+        "llm_usage": {name: stats.stats() for name, stats in model_usage.items()},
+        "model_router": model_router.stats() if model_router is not None else None,
+        "llm_http": llm_http.stats(),
+        "mcp_sessions": mcp_sessions.status,
+        "mcp_health": mcp_supervisor.stats(),
+        "mcp_tool_catalogs": {name: catalog.stats() for name, catalog in mcp_catalogs.items()},
+        "mcp_result_caches": {name: cache.stats() for name, cache in mcp_result_caches.items()},
+        "mcp_limits": {name: toolset.stats() for name, toolset in mcp_limits.items()},
+        "mcp_large_results": {
+            "store": mcp_result_store.stats(),
+            "servers": {name: toolset.stats() for name, toolset in mcp_large_results.items()},
+        },
+        "mcp_pools": {
+            server.name: server.stats() for server in mcp_sessions.servers.values() if isinstance(server, StdioServerPool)
+        },
+        "mcp_config": mcp_reloader.stats(),
+    }
+    return JSONResponse(metrics)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Open MCP sessions once for the process lifetime and release shared resources on shutdown"""
+    # Connect to the LLM provider while the MCP servers start
+    await asyncio.gather(
+        mcp_sessions.start(),
+        llm_http.prewarm(llm_clients, connections=LLM_PREWARM_CONNECTIONS),
+    )
+    mcp_supervisor.start()
+    mcp_reloader.start()
+    try:
+        yield
+    finally:
+        await mcp_reloader.stop()
+        await mcp_supervisor.stop()
+        await mcp_sessions.stop()
+        await tavily_client.aclose()
+        await llm_http.aclose()
+
+
 # Expose the agent as an AG-UI compatible ASGI application
-app = agent.to_ag_ui()
+app = agent.to_ag_ui(
+    lifespan=lifespan,
+    routes=[
+        Route("/tools", tools_endpoint, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+)
 
 # Add middleware to log requests
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -352,7 +930,7 @@ if __name__ == "__main__":
     logger.info("=" * 60)
     logger.info("📝 Logging enabled - check agent.log for detailed logs")
     logger.info(f"🤖 Model: {'LLM Farm (Custom)' if use_llm_farm else 'OpenAI GPT-4o-mini'}")
-    logger.info("🔧 Built-in tools: tavily_search")
+    logger.info("🔧 Built-in tools: tavily_search, tavily_search_many")
     if mcp_servers:
         logger.info("🔧 MCP servers loaded - additional tools available")
         logger.info("   Check /tools endpoint to see all available tools")
@@ -361,6 +939,7 @@ if __name__ == "__main__":
     logger.info("🌐 Server starting on http://0.0.0.0:8000")
     logger.info("🔗 AG-UI endpoint: http://0.0.0.0:8000/")
     logger.info("ℹ️  Tools endpoint: http://0.0.0.0:8000/tools")
+    logger.info("📊 Metrics endpoint: http://0.0.0.0:8000/metrics")
     if use_llm_farm:
         logger.info("⚙️  Environment: Set LLM_FARM_API_KEY and TAVILY_API_KEY")
     else:
@@ -0,0 +1,53 @@
+"""
+Minimal Okapi BM25 ranker.
+
+A dependency-free lexical scorer used to rank short text units (page
+passages, tool descriptions) against a query.
+"""
+
+import re
+import math
+from collections import Counter
+from typing import List, Sequence
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how i in is it its of on or that the
+this to was were what when where which who why will with you your do does can
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords or single characters"""
+    return [w for w in _WORD.findall(text.casefold()) if len(w) > 1 and w not in STOPWORDS]
+
+
+class BM25:
+    """BM25 scores for a fixed corpus of pre-tokenized documents"""
+
+    def __init__(self, documents: Sequence[Sequence[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.doc_lengths = [len(doc) for doc in documents]
+        self.avg_length = (sum(self.doc_lengths) / len(documents)) if documents else 0.0
+        doc_freqs: Counter = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    def score(self, query_terms: Sequence[str], index: int) -> float:
+        tf = self.term_freqs[index]
+        length_norm = 1 - self.b + self.b * (self.doc_lengths[index] / self.avg_length if self.avg_length else 0)
+        total = 0.0
+        for term in set(query_terms):
+            freq = tf.get(term)
+            if not freq:
+                continue
+            total += self.idf[term] * freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+        return total
+
+    def scores(self, query_terms: Sequence[str]) -> List[float]:
+        return [self.score(query_terms, i) for i in range(len(self.term_freqs))]
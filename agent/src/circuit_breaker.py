@@ -0,0 +1,135 @@
+"""
+Circuit breakers for external dependencies (Tavily, MCP servers).
+
+A breaker watches the outcome of recent calls. When the failure rate over the
+window crosses the threshold it opens and rejects calls immediately with
+CircuitOpenError until the cooldown has passed; it then lets a probe call
+through (half-open) and closes again once the probe succeeds.
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": str(self),
+            "dependency": self.name,
+            "circuit": OPEN,
+            "retry_after": round(self.retry_after, 1),
+        }
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by the failure rate of recent calls"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        min_calls: int = 5,
+        window: int = 20,
+        cooldown: float = 30.0,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.is_failure = is_failure or (lambda e: True)
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == OPEN:
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                self.short_circuited += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = HALF_OPEN
+            logger.info(f"Circuit '{self.name}' half-open, letting a probe call through")
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.short_circuited += 1
+                raise CircuitOpenError(self.name, self.cooldown)
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN:
+            logger.info(f"Circuit '{self.name}' closed after a successful probe")
+            self.state = CLOSED
+            self._outcomes.clear()
+        self._outcomes.append(True)
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self._outcomes.append(False)
+        if self.state == HALF_OPEN or (
+            len(self._outcomes) >= self.min_calls and self.failure_rate() >= self.failure_rate_threshold
+        ):
+            self._open()
+
+    def _open(self):
+        if self.state != OPEN:
+            self.times_opened += 1
+            logger.warning(
+                f"Circuit '{self.name}' opened (failure rate {self.failure_rate():.0%}), "
+                f"short-circuiting calls for {self.cooldown:g}s"
+            )
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() under the breaker, recording its outcome"""
+        self.allow()
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, Exception) and self.is_failure(e):
+                self.record_failure()
+            else:
+                # Cancellations and caller-side errors say nothing about the dependency
+                self._probe_in_flight = False
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        retry_after = self._opened_at + self.cooldown - time.monotonic() if self.state == OPEN else 0.0
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 3),
+            "calls_in_window": len(self._outcomes),
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited,
+            "retry_after": round(max(retry_after, 0.0), 1),
+        }
@@ -0,0 +1,75 @@
+"""
+Hedged requests for tail-latency control.
+
+A call that has not completed after the observed p95 latency gets a second,
+identical attempt; whichever finishes first wins and the other is cancelled.
+Until enough samples exist to estimate p95, calls are not hedged.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """Runs calls with an optional p95-delayed backup attempt"""
+
+    def __init__(self, enabled: bool = True, percentile: float = 95, min_samples: int = 20, min_delay: float = 0.5):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latency = LatencyTracker()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before firing the backup attempt, or None to not hedge"""
+        if not self.enabled or self.latency.count < self.min_samples:
+            return None
+        return max(self.latency.percentile(self.percentile), self.min_delay)
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Await call(), firing a second call() if the first is slower than the hedge delay"""
+        start = time.monotonic()
+        primary = asyncio.ensure_future(call())
+        pending = {primary}
+        try:
+            delay = self.delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self.hedged += 1
+                    logger.info(f"Hedging slow call after {delay:.2f}s")
+                    pending.add(asyncio.ensure_future(call()))
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self.latency.record(time.monotonic() - start)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "delay": self.delay(),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "latency_seconds": self.latency.stats(),
+        }
@@ -0,0 +1,112 @@
+"""
+Pooled httpx clients configured from the environment.
+
+Each outbound API (the LLM provider, Tavily) gets one shared
+httpx.AsyncClient per process with explicit pool limits, keep-alive expiry,
+connect/read timeouts and optional HTTP/2, all read from a family of
+environment variables such as TAVILY_MAX_CONNECTIONS or
+LLM_HTTP_KEEPALIVE_EXPIRY.
+"""
+
+import os
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class PooledHttpClient:
+    """One shared, pooled httpx.AsyncClient, created on first use"""
+
+    def __init__(
+        self,
+        name: str,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        http2: bool = False,
+        http2_var: str = "HTTP2",
+        **client_kwargs: Any,
+    ):
+        self.name = name
+        self.http2 = http2
+        # Named in the warning when HTTP/2 was requested but h2 is missing
+        self.http2_var = http2_var
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._client_kwargs = client_kwargs
+        self._client: Optional[httpx.AsyncClient] = None
+        # Whether the client was created with HTTP/2 (it needs the optional h2 package)
+        self.http2_enabled = False
+
+    @staticmethod
+    def env_settings(
+        prefix: str,
+        http2_var: Optional[str] = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+    ) -> Dict[str, Any]:
+        """Pool settings from {prefix}_MAX_CONNECTIONS etc., with the given defaults"""
+        http2_var = http2_var or f"{prefix}_HTTP2"
+        return {
+            "max_connections": int(os.getenv(f"{prefix}_MAX_CONNECTIONS", str(max_connections))),
+            "max_keepalive_connections": int(
+                os.getenv(f"{prefix}_MAX_KEEPALIVE_CONNECTIONS", str(max_keepalive_connections))
+            ),
+            "keepalive_expiry": float(os.getenv(f"{prefix}_KEEPALIVE_EXPIRY", str(keepalive_expiry))),
+            "connect_timeout": float(os.getenv(f"{prefix}_CONNECT_TIMEOUT", str(connect_timeout))),
+            "read_timeout": float(os.getenv(f"{prefix}_READ_TIMEOUT", str(read_timeout))),
+            "http2": os.getenv(http2_var, "false").lower() == "true",
+            "http2_var": http2_var,
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared httpx client, created on first use"""
+        if self._client is None or self._client.is_closed:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning(f"{self.http2_var}=true but the 'h2' package is not installed, "
+                                   f"falling back to HTTP/1.1")
+                    http2 = False
+            self._client = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout, http2=http2, **self._client_kwargs
+            )
+            self.http2_enabled = http2
+            logger.info(
+                f"{self.name} HTTP client created (http2={http2}, "
+                f"max_connections={self.limits.max_connections}, "
+                f"max_keepalive={self.limits.max_keepalive_connections}, "
+                f"keepalive_expiry={self.limits.keepalive_expiry:g}s)"
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info(f"{self.name} HTTP client closed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2_enabled,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "connect_timeout": self.timeout.connect,
+            "read_timeout": self.timeout.read,
+        }
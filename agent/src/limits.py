@@ -0,0 +1,126 @@
+"""
+Admission control for outbound calls.
+
+ConcurrencyLimiter bounds how many calls run at once and how many may queue
+behind them; TokenBucket paces calls to an upstream rate limit. Both reject
+work that would wait longer than its budget with OverloadedError, so callers
+can fail fast with a clear message instead of piling up.
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+from metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Raised when a call is rejected because its queue or wait budget is exhausted"""
+
+
+class ConcurrencyLimiter:
+    """Async semaphore with a bounded wait queue and wait-time metrics"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int = 32, max_wait: float = 10.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.wait_times = LatencyTracker()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of the block"""
+        if self.in_flight + self.queued >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise OverloadedError(
+                f"{self.name} is overloaded: {self.in_flight} calls running and {self.queued} queued, try again shortly"
+            )
+
+        start = time.monotonic()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise OverloadedError(
+                f"{self.name} is overloaded: no free slot after waiting {self.max_wait:g}s, try again shortly"
+            ) from None
+        finally:
+            self.queued -= 1
+        self.wait_times.record(time.monotonic() - start)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "wait_seconds": self.wait_times.stats(),
+        }
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, name: str, rate: float, capacity: float, max_wait: float = 10.0):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self.throttled = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Take one token, sleeping until it is available"""
+        if not self.enabled:
+            return
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return
+        wait = (1 - self._tokens) / self.rate
+        if wait > self.max_wait:
+            self.rejected += 1
+            raise OverloadedError(f"{self.name} rate limit reached, next slot in {wait:.1f}s, try again shortly")
+        # Reserve the token now so concurrent callers queue up behind us
+        self._tokens -= 1
+        self.throttled += 1
+        await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate_per_second": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self._tokens, 2),
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
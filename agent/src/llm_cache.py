@@ -0,0 +1,262 @@
+"""
+Exact-match cache for LLM responses.
+
+Repeated boilerplate questions ("what can you do?") produce the same request
+to the model every time. This model wrapper keys each request on a hash of
+its message history (which includes the system prompt), the tool schemas and
+the model settings, and serves a stored response instead of calling the
+provider. Only plain text responses that the provider finished with "stop"
+(and, when streamed, that were read to the end) are cached: a response that
+calls tools depends on live state and is always requested fresh. For the
+same reason a request made after tool calls for the current user prompt (the
+answer that summarizes live tool results) is neither looked up nor stored.
+Cached responses are replayed as a stream, so streaming clients see the same
+events as for a live response.
+"""
+
+import json
+import time
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic_ai.messages import (
+    ModelMessagesTypeAdapter, ModelRequest, ModelResponse, RetryPromptPart, TextPart, ToolCallPart, ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models import StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+
+from search_cache import SearchCache
+from search_store import SearchStore
+
+logger = logging.getLogger(__name__)
+
+
+def _part_key(part: Any) -> Dict[str, Any]:
+    """The parts of a message part that affect the model's answer (no ids or timestamps)"""
+    key = {"kind": getattr(part, "part_kind", type(part).__name__)}
+    for attr in ("content", "tool_name", "args", "model_name"):
+        if hasattr(part, attr):
+            key[attr] = getattr(part, attr)
+    return key
+
+
+def request_key(model_name: str, messages: List[Any], model_settings: Optional[Dict[str, Any]], params: Any) -> str:
+    """Hash of everything that determines the model's response to a request"""
+    tools = [
+        {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.parameters_json_schema,
+            "strict": getattr(tool, "strict", None),
+        }
+        for tool in [*getattr(params, "function_tools", []), *getattr(params, "output_tools", [])]
+    ]
+    payload = {
+        "model": model_name,
+        "settings": model_settings or {},
+        "output_mode": getattr(params, "output_mode", None),
+        "allow_text_output": getattr(params, "allow_text_output", None),
+        "tools": sorted(tools, key=lambda tool: tool["name"]),
+        "messages": [
+            {
+                "kind": getattr(message, "kind", type(message).__name__),
+                "instructions": getattr(message, "instructions", None),
+                "parts": [_part_key(part) for part in message.parts],
+            }
+            for message in messages
+        ],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(response: ModelResponse) -> bool:
+    """Text-only responses the provider finished normally; anything with tool calls is never cached
+
+    A response without a finish reason may have been cut off (length limit,
+    content filter, dropped stream), so it is not cached either.
+    """
+    if not response.parts or not all(isinstance(part, TextPart) for part in response.parts):
+        return False
+    return response.finish_reason == "stop"
+
+
+def uses_tool_results(messages: List[Any]) -> bool:
+    """Whether tools were called (or retried) since the latest user prompt"""
+    for message in reversed(messages):
+        for part in message.parts:
+            if isinstance(part, (ToolCallPart, ToolReturnPart, RetryPromptPart)):
+                return True
+        if isinstance(message, ModelRequest) and any(isinstance(part, UserPromptPart) for part in message.parts):
+            return False
+    return False
+
+
+def _stream_events(result: Any) -> List[Any]:
+    """Normalize a parts-manager result (one event, None, or several) to a list"""
+    if result is None:
+        return []
+    if hasattr(result, "event_kind"):
+        return [result]
+    return list(result)
+
+
+def _watch_exhaustion(stream: StreamedResponse):
+    """Set stream.exhausted once the consumer has read its events to the end
+
+    A consumer may stop reading early; stream.get() then returns the text so
+    far, which must not be cached as the full response.
+    """
+    events = stream._get_event_iterator
+    stream.exhausted = False
+
+    async def watched() -> AsyncIterator[Any]:
+        async for event in events():
+            yield event
+        stream.exhausted = True
+
+    stream._get_event_iterator = watched
+
+
+@dataclass
+class ReplayedStreamedResponse(StreamedResponse):
+    """Streams a cached response back in small text deltas"""
+
+    response: Optional[ModelResponse] = None
+    chunk_chars: int = 64
+
+    async def _get_event_iterator(self) -> AsyncIterator[Any]:
+        # Nothing was sent to the provider, so the replay uses no tokens
+        for index, part in enumerate(self.response.parts):
+            content = part.content or ""
+            for start in range(0, max(len(content), 1), self.chunk_chars):
+                delta = self._parts_manager.handle_text_delta(
+                    vendor_part_id=index, content=content[start:start + self.chunk_chars]
+                )
+                for event in _stream_events(delta):
+                    yield event
+        self.finish_reason = self.response.finish_reason
+
+    @property
+    def model_name(self) -> str:
+        return self.response.model_name or ""
+
+    @property
+    def provider_name(self) -> Optional[str]:
+        return getattr(self.response, "provider_name", None)
+
+    @property
+    def provider_url(self) -> Optional[str]:
+        return getattr(self.response, "provider_url", None)
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.now(tz=timezone.utc)
+
+
+class ResponseCacheModel(WrapperModel):
+    """Serves repeated text-only model requests from a memory + disk cache"""
+
+    def __init__(self, wrapped: Any, cache: SearchCache, store: Optional[SearchStore] = None):
+        super().__init__(wrapped)
+        self.cache = cache
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.uncacheable = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        # Average latency of live responses, credited to each hit as time saved
+        self._live_seconds = 0.0
+        self._live_count = 0
+
+    async def _lookup(self, key: str) -> Optional[ModelResponse]:
+        response = self.cache.get(key)
+        if response is None and self.store is not None:
+            payload = await self.store.get(key)
+            if payload is not None:
+                response = ModelMessagesTypeAdapter.validate_json(payload)[0]
+                self.cache.set(key, response)
+        if response is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self._live_count:
+            self.saved_seconds += self._live_seconds / self._live_count
+        logger.info(f"⚡ LLM response cache hit ({key[:12]})")
+        return response
+
+    async def _remember(self, key: str, response: ModelResponse, elapsed: float):
+        self._live_seconds += elapsed
+        self._live_count += 1
+        if not is_cacheable(response):
+            self.uncacheable += 1
+            return
+        self.cache.set(key, response)
+        if self.store is not None:
+            await self.store.set(key, ModelMessagesTypeAdapter.dump_json([response]).decode())
+        self.stored += 1
+
+    def _key(self, messages, model_settings, model_request_parameters) -> Optional[str]:
+        """Cache key of a request, or None when its answer depends on live tool results"""
+        if uses_tool_results(messages):
+            self.bypassed += 1
+            return None
+        return request_key(self.wrapped.model_name, messages, model_settings, model_request_parameters)
+
+    async def request(self, messages, model_settings, model_request_parameters) -> ModelResponse:
+        key = self._key(messages, model_settings, model_request_parameters)
+        if key is None:
+            return await self.wrapped.request(messages, model_settings, model_request_parameters)
+        cached = await self._lookup(key)
+        if cached is not None:
+            return cached
+        start = time.monotonic()
+        response = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        await self._remember(key, response, time.monotonic() - start)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(self, messages, model_settings, model_request_parameters, run_context=None):
+        key = self._key(messages, model_settings, model_request_parameters)
+        if key is None:
+            async with self.wrapped.request_stream(
+                messages, model_settings, model_request_parameters, run_context
+            ) as stream:
+                yield stream
+            return
+        cached = await self._lookup(key)
+        if cached is not None:
+            yield ReplayedStreamedResponse(model_request_parameters=model_request_parameters, response=cached)
+            return
+        start = time.monotonic()
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            _watch_exhaustion(stream)
+            yield stream
+        # Reached only when the consumer closed the stream without an error
+        if not stream.exhausted:
+            self.uncacheable += 1
+            return
+        await self._remember(key, stream.get(), time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "memory": self.cache.stats(),
+            "persistent": self.store.stats() if self.store is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stored": self.stored,
+            "uncacheable": self.uncacheable,
+            "bypassed": self.bypassed,
+            "saved_seconds": round(self.saved_seconds, 2),
+        }
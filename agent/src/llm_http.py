@@ -0,0 +1,96 @@
+"""
+Pooled HTTP client for the LLM provider.
+
+Both model tiers talk to the provider over one explicitly configured
+httpx.AsyncClient (pool size, keep-alive expiry, optional HTTP/2, connect and
+read timeouts) instead of whatever default transport the OpenAI SDK builds.
+prewarm() opens connections at startup so the first chat after a deploy does
+not pay for DNS resolution and the TLS handshake. It sends the cheapest
+authenticated request the provider offers (GET /models) through the
+provider's own OpenAI client, so the gateway sees ordinary, credentialed
+traffic.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Sequence
+from urllib.parse import urlsplit
+
+from openai import APIStatusError, AsyncOpenAI
+
+from http_pool import PooledHttpClient
+
+logger = logging.getLogger(__name__)
+
+
+class LLMHttpClient(PooledHttpClient):
+    """One shared, pooled HTTP client for an LLM provider"""
+
+    def __init__(self, provider: str, max_connections: int = 50, max_keepalive_connections: int = 20,
+                 read_timeout: float = 120.0, **kwargs: Any):
+        super().__init__(provider, max_connections=max_connections,
+                         max_keepalive_connections=max_keepalive_connections, read_timeout=read_timeout, **kwargs)
+        self.provider = provider
+        self.prewarmed = 0
+        self.prewarm_failures = 0
+        self.prewarm_seconds: Optional[float] = None
+
+    @classmethod
+    def from_env(cls, provider: str) -> "LLMHttpClient":
+        """Build a client from LLM_HTTP_* environment variables (and LLM_HTTP2)"""
+        return cls(provider, **cls.env_settings(
+            "LLM_HTTP", http2_var="LLM_HTTP2", max_connections=50, max_keepalive_connections=20, read_timeout=120,
+        ))
+
+    async def _open_connection(self, llm_client: AsyncOpenAI, timeout: float) -> bool:
+        url = f"{llm_client.base_url}models"
+        try:
+            # Sent with the client's own credentials, headers and query (e.g. api-version)
+            response = await llm_client.with_options(max_retries=0, timeout=timeout).models.with_raw_response.list()
+            http_response = response.http_response
+        except APIStatusError as e:
+            # An error status (e.g. a deployment URL without a models route) still
+            # leaves a warm keep-alive connection unless the server closes it
+            http_response = e.response
+        except Exception as e:
+            logger.warning(f"⚠️ {self.provider} connection pre-warm to {url} failed: {type(e).__name__}: {e}")
+            return False
+        if http_response.status_code in (401, 403):
+            logger.warning(f"⚠️ {self.provider} rejected the pre-warm request to {url} "
+                           f"(HTTP {http_response.status_code}); check the API key")
+        if http_response.headers.get("connection", "").lower() == "close":
+            logger.warning(f"⚠️ {self.provider} closed the pre-warm connection to {url} "
+                           f"(HTTP {http_response.status_code})")
+            return False
+        return True
+
+    async def prewarm(self, llm_clients: Sequence[AsyncOpenAI], connections: int = 2, timeout: float = 10.0):
+        """Open `connections` keep-alive connections to each distinct host the clients talk to"""
+        origins = {}
+        for llm_client in llm_clients:
+            parts = urlsplit(str(llm_client.base_url))
+            origins.setdefault(f"{parts.scheme}://{parts.netloc}", llm_client)
+        if not origins or connections <= 0:
+            return
+        self.client  # creating the client settles whether HTTP/2 is in use
+        # One connection per origin is enough with HTTP/2 multiplexing
+        per_origin = 1 if self.http2_enabled else min(connections, self.limits.max_keepalive_connections or connections)
+        start = time.monotonic()
+        results = await asyncio.gather(*(
+            self._open_connection(llm_client, timeout) for llm_client in origins.values() for _ in range(per_origin)
+        ))
+        self.prewarm_seconds = time.monotonic() - start
+        self.prewarmed += sum(results)
+        self.prewarm_failures += len(results) - sum(results)
+        logger.info(f"🔥 {self.provider}: pre-warmed {sum(results)}/{len(results)} connections to "
+                    f"{', '.join(origins)} in {self.prewarm_seconds:.2f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            **super().stats(),
+            "prewarmed": self.prewarmed,
+            "prewarm_failures": self.prewarm_failures,
+            "prewarm_seconds": round(self.prewarm_seconds, 3) if self.prewarm_seconds is not None else None,
+        }
@@ -17,6 +17,7 @@ if __name__ == "__main__":
     logger.info("🌐 Server starting on http://0.0.0.0:8000")
     logger.info("🔗 AG-UI endpoint: http://0.0.0.0:8000/")
     logger.info("ℹ️  Tools endpoint: http://0.0.0.0:8000/tools")
+    logger.info("📊 Metrics endpoint: http://0.0.0.0:8000/metrics")
     logger.info("⚙️  Configure .env with your API keys")
     logger.info("=" * 60)
     
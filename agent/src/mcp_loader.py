@@ -0,0 +1,76 @@
+"""
+Build MCP server objects from an already-parsed mcp_config.json.
+
+The config file is read and validated once; server entries are turned into
+pydantic-ai MCP servers directly instead of handing the path to
+load_mcp_servers, which would parse and validate the same file again.
+Agent-side keys on an entry (pool, cache, lazy, ...) are simply not passed on.
+"""
+
+import os
+import re
+import logging
+from typing import Any, Dict, List, Optional
+
+from pydantic_ai.mcp import MCPServerSSE, MCPServerStdio, MCPServerStreamableHTTP
+
+logger = logging.getLogger(__name__)
+
+# ${VAR}, ${VAR:default} and ${VAR:-default}
+_ENV_VAR = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)(?::-?([^}]*))?\}")
+
+
+def expand_env_vars(value: Any) -> Any:
+    """Substitute environment variables in strings, recursively"""
+    if isinstance(value, str):
+        def substitute(match):
+            default = match.group(2)
+            resolved = os.environ.get(match.group(1), default)
+            if resolved is None:
+                raise ValueError(f"Environment variable {match.group(1)} is not set and has no default")
+            return os.path.expanduser(resolved) if resolved.startswith("~") else resolved
+        return _ENV_VAR.sub(substitute, value)
+    if isinstance(value, list):
+        return [expand_env_vars(item) for item in value]
+    if isinstance(value, dict):
+        return {key: expand_env_vars(item) for key, item in value.items()}
+    return value
+
+
+def build_mcp_server(name: str, entry: Dict[str, Any], startup_timeout: Optional[float] = None) -> Any:
+    """Create the MCP server for one mcpServers entry (tools are prefixed with its name)
+
+    The server's initialize handshake is bounded by its "timeout"; without one
+    it gets the startup timeout ("startupTimeout", else `startup_timeout`)
+    instead of pydantic-ai's 5s default, which a cold `uvx`/`npx` start exceeds.
+    """
+    entry = expand_env_vars(entry)
+    common = {"id": name, "tool_prefix": name}
+    timeout = entry.get("timeout", entry.get("startupTimeout", startup_timeout))
+    if timeout is not None:
+        common["timeout"] = float(timeout)
+
+    if "command" in entry:
+        return MCPServerStdio(
+            entry["command"],
+            list(entry.get("args", [])),
+            env=entry.get("env"),
+            cwd=entry.get("cwd"),
+            **common,
+        )
+    if "url" in entry:
+        if entry.get("type") == "sse" or entry["url"].rstrip("/").endswith("/sse"):
+            return MCPServerSSE(entry["url"], headers=entry.get("headers"), **common)
+        return MCPServerStreamableHTTP(entry["url"], headers=entry.get("headers"), **common)
+    raise ValueError(f"MCP server '{name}' needs either a 'command' or a 'url'")
+
+
+def build_mcp_servers(server_configs: Dict[str, Dict[str, Any]], startup_timeout: Optional[float] = None) -> List[Any]:
+    """Create MCP servers for every valid entry, skipping (and logging) broken ones"""
+    servers = []
+    for name, entry in server_configs.items():
+        try:
+            servers.append(build_mcp_server(name, entry, startup_timeout))
+        except Exception as e:
+            logger.error(f"❌ Skipping MCP server '{name}': {type(e).__name__}: {e}")
+    return servers
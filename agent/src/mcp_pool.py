@@ -0,0 +1,344 @@
+"""
+Pool of warm stdio MCP server processes.
+
+A single stdio MCP server serializes every request over one pipe. The pool
+runs several identical server processes, dispatches each tool call to the
+least busy healthy worker, health-checks the workers periodically and
+recycles a worker after a number of calls or when its memory grows too large.
+
+Each worker's server session is owned by a dedicated task so that it can be
+started and stopped independently of the agent runs that use it.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from pydantic_ai.mcp import MCPServerStdio
+from pydantic_ai.toolsets import AbstractToolset
+
+logger = logging.getLogger(__name__)
+
+
+def _process_table() -> Dict[int, int]:
+    """pid -> parent pid for every process visible in /proc"""
+    table = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields after ')' are fixed
+                fields = f.read().rsplit(")", 1)[1].split()
+            table[int(entry)] = int(fields[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return table
+
+
+def _children(pid: int) -> Set[int]:
+    return {child for child, parent in _process_table().items() if parent == pid}
+
+
+def _tree_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process and all its descendants, in MB"""
+    table = _process_table()
+    if pid not in table:
+        return None
+    pids, frontier = {pid}, [pid]
+    while frontier:
+        parent = frontier.pop()
+        for child, ppid in table.items():
+            if ppid == parent and child not in pids:
+                pids.add(child)
+                frontier.append(child)
+    total_kb = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+def clone_stdio_server(server: MCPServerStdio) -> MCPServerStdio:
+    """A fresh, unstarted copy of a stdio MCP server definition"""
+    return MCPServerStdio(
+        server.command,
+        list(server.args),
+        env=server.env,
+        cwd=server.cwd,
+        tool_prefix=server.tool_prefix,
+        timeout=server.timeout,
+        id=server.id,
+    )
+
+
+class MCPWorker:
+    """One MCP server session owned by its own task
+
+    anyio requires a session to be closed by the task that opened it, so the
+    session is entered and exited inside a dedicated task that waits for a
+    stop signal, making start and stop callable from any task.
+    """
+
+    def __init__(self, server: Any, index: int):
+        self.server = server
+        self.index = index
+        self.pid: Optional[int] = None
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.draining = False
+        self.started_at = 0.0
+        self.error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        if self._task is None or self._task.done() or self.error is not None:
+            return False
+        return self.pid is None or os.path.exists(f"/proc/{self.pid}")
+
+    async def start(self, timeout: float):
+        """Start the session and wait until it is ready
+
+        A stdio server's pid is identified as the new child of this process.
+        Every stdio spawn in the process holds _spawn_lock until its child
+        appears, so concurrent starts (pool workers, eager servers, supervisor
+        restarts) cannot claim each other's processes; the MCP handshake runs
+        after the lock is released.
+        """
+        deadline = time.monotonic() + timeout
+        if isinstance(self.server, MCPServerStdio):
+            async with _spawn_lock:
+                before = _children(os.getpid())
+                self._task = asyncio.create_task(self._run(), name=f"mcp-worker-{self.index}")
+                self.pid = await self._wait_for_child(before, deadline)
+        else:
+            self._task = asyncio.create_task(self._run(), name=f"mcp-worker-{self.index}")
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            raise
+        if self.error is not None:
+            raise self.error
+        self.started_at = time.monotonic()
+
+    async def _wait_for_child(self, before: Set[int], deadline: float) -> Optional[int]:
+        """The pid of the process spawned by _run, or None if none appeared"""
+        while time.monotonic() < deadline:
+            new_children = _children(os.getpid()) - before
+            if new_children:
+                return min(new_children)
+            if self._ready.is_set():
+                # Failed (or finished) without a visible child process
+                return None
+            await asyncio.sleep(0.01)
+        return None
+
+    async def _run(self):
+        try:
+            async with self.server:
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self.error = e
+            logger.error(f"❌ MCP worker {self.index} exited: {type(e).__name__}: {e}")
+        finally:
+            self._ready.set()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=10)
+            except (asyncio.TimeoutError, Exception) as e:
+                logger.warning(f"MCP worker {self.index} did not stop cleanly: {type(e).__name__}: {e}")
+
+    def rss_mb(self) -> Optional[float]:
+        return _tree_rss_mb(self.pid) if self.pid else None
+
+    def stats(self) -> Dict[str, Any]:
+        rss = self.rss_mb()
+        return {
+            "index": self.index,
+            "pid": self.pid,
+            "alive": self.alive,
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rss_mb": round(rss, 1) if rss is not None else None,
+        }
+
+
+class StdioServerPool(AbstractToolset):
+    """Toolset that spreads one stdio MCP server's tool calls over N worker processes"""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        size: int = 2,
+        max_calls: int = 500,
+        max_rss_mb: Optional[float] = None,
+        health_interval: float = 30.0,
+        health_timeout: float = 10.0,
+        start_timeout: float = 60.0,
+    ):
+        self.name = name
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_calls = max_calls
+        self.max_rss_mb = max_rss_mb
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.start_timeout = start_timeout
+        self.workers: List[MCPWorker] = []
+        self.recycled = 0
+        self._next_index = 0
+        self._running_count = 0
+        self._lock = asyncio.Lock()
+        self._health_task: Optional[asyncio.Task] = None
+        self._recycling: Set[int] = set()
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.name
+
+    @property
+    def label(self) -> str:
+        return f"StdioServerPool({self.name!r}, size={self.size})"
+
+    async def __aenter__(self):
+        async with self._lock:
+            self._running_count += 1
+            if self._running_count == 1:
+                await asyncio.gather(*(self._spawn() for _ in range(self.size)), return_exceptions=True)
+                if not self.workers:
+                    self._running_count -= 1
+                    raise RuntimeError(f"No worker of MCP server pool '{self.name}' could be started")
+                self._health_task = asyncio.create_task(self._health_loop(), name=f"mcp-pool-health-{self.name}")
+                logger.info(f"🔌 MCP pool '{self.name}' started {len(self.workers)}/{self.size} workers")
+        return self
+
+    async def __aexit__(self, *args) -> Optional[bool]:
+        async with self._lock:
+            self._running_count -= 1
+            if self._running_count == 0:
+                if self._health_task is not None:
+                    self._health_task.cancel()
+                workers, self.workers = self.workers, []
+                await asyncio.gather(*(worker.stop() for worker in workers))
+                logger.info(f"🔌 MCP pool '{self.name}' stopped")
+        return None
+
+    async def _spawn(self) -> MCPWorker:
+        self._next_index += 1
+        worker = MCPWorker(self.factory(), self._next_index)
+        try:
+            await worker.start(self.start_timeout)
+        except Exception as e:
+            logger.error(f"❌ MCP pool '{self.name}' failed to start worker {worker.index}: {type(e).__name__}: {e}")
+            raise
+        self.workers.append(worker)
+        logger.info(f"🔌 MCP pool '{self.name}' worker {worker.index} ready (pid {worker.pid})")
+        return worker
+
+    def _pick(self) -> MCPWorker:
+        alive = [w for w in self.workers if w.alive]
+        # Draining workers still serve while their replacements are starting
+        candidates = [w for w in alive if not w.draining] or alive
+        if not candidates:
+            raise RuntimeError(f"MCP server pool '{self.name}' has no healthy workers")
+        return min(candidates, key=lambda w: (w.in_flight, w.calls))
+
+    async def get_tools(self, ctx) -> Dict[str, Any]:
+        return await self._pick().server.get_tools(ctx)
+
+    async def call_tool(self, name: str, tool_args: Dict[str, Any], ctx, tool) -> Any:
+        worker = self._pick()
+        worker.in_flight += 1
+        try:
+            return await worker.server.call_tool(name, tool_args, ctx, tool)
+        except Exception:
+            worker.failures += 1
+            raise
+        finally:
+            worker.in_flight -= 1
+            worker.calls += 1
+            if self.max_calls and worker.calls >= self.max_calls:
+                self._schedule_recycle(worker, f"reached {worker.calls} calls")
+
+    def _schedule_recycle(self, worker: MCPWorker, reason: str):
+        if worker.index in self._recycling or worker not in self.workers:
+            return
+        self._recycling.add(worker.index)
+        asyncio.create_task(self._recycle(worker, reason))
+
+    async def _recycle(self, worker: MCPWorker, reason: str):
+        """Start a replacement, then drain and stop the old worker"""
+        logger.info(f"♻️ Recycling MCP pool '{self.name}' worker {worker.index}: {reason}")
+        worker.draining = True
+        try:
+            try:
+                await self._spawn()
+            except Exception:
+                # Keep serving from the old worker if it is still usable
+                worker.draining = not worker.alive
+                return
+            while worker.in_flight and worker.alive:
+                await asyncio.sleep(0.1)
+            if worker in self.workers:
+                self.workers.remove(worker)
+            await worker.stop()
+            self.recycled += 1
+        finally:
+            self._recycling.discard(worker.index)
+
+    async def check_health(self):
+        """Ping every worker and recycle dead, unresponsive or bloated ones"""
+        for worker in list(self.workers):
+            if worker.draining:
+                continue
+            if not worker.alive:
+                self._schedule_recycle(worker, "process exited")
+                continue
+            try:
+                await asyncio.wait_for(worker.server.list_tools(), timeout=self.health_timeout)
+            except Exception as e:
+                self._schedule_recycle(worker, f"health check failed ({type(e).__name__})")
+                continue
+            rss = worker.rss_mb()
+            if self.max_rss_mb and rss and rss > self.max_rss_mb:
+                self._schedule_recycle(worker, f"memory {rss:.0f}MB > {self.max_rss_mb:g}MB")
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"❌ MCP pool '{self.name}' health check error: {type(e).__name__}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "recycled": self.recycled,
+            "workers": [worker.stats() for worker in self.workers],
+        }
+
+
+# Held by every stdio server start in the process until its child process appears
+_spawn_lock = asyncio.Lock()
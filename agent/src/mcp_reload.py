@@ -0,0 +1,171 @@
+"""
+Hot reload of mcp_config.json.
+
+The config file is polled for changes. When its server set changes, new and
+modified servers are built and started, the agent's MCP toolsets are swapped
+for new runs, and removed or replaced servers are stopped once the runs still
+using the previous toolsets have finished (or a drain timeout has passed).
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mcp_toolsets import MCPSessionManager, SwappableToolset
+
+logger = logging.getLogger(__name__)
+
+
+class MCPConfigReloader:
+    """Polls mcp_config.json and applies server additions, removals and changes"""
+
+    def __init__(
+        self,
+        path: str,
+        configs: Dict[str, Dict[str, Any]],
+        toolsets: Dict[str, Any],
+        registry: SwappableToolset,
+        sessions: MCPSessionManager,
+        build: Callable[[str, Dict[str, Any]], Optional[Any]],
+        forget: Callable[[str], None],
+        interval: float = 5.0,
+        drain_timeout: float = 300.0,
+    ):
+        self.path = path
+        self.configs = dict(configs)
+        self.toolsets = dict(toolsets)
+        self.registry = registry
+        self.sessions = sessions
+        self.build = build
+        self.forget = forget
+        self.interval = interval
+        self.drain_timeout = drain_timeout
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error: Optional[str] = None
+        self._signature = self._file_signature()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._drains: List[asyncio.Task] = []
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_configs(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            configs = json.load(f).get("mcpServers", {})
+        if not isinstance(configs, dict):
+            raise ValueError("'mcpServers' must be an object")
+        return configs
+
+    async def check(self):
+        """Reload if the file changed since the last check"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        self._signature = signature
+        await self.reload()
+
+    async def reload(self):
+        async with self._lock:
+            try:
+                configs = self._read_configs()
+            except (OSError, ValueError) as e:
+                # Keep serving the last good configuration
+                self.failed_reloads += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.error(f"❌ Ignoring invalid MCP config {self.path}: {self.last_error}")
+                return
+            removed = [name for name in self.configs if name not in configs]
+            added = [name for name in configs if name not in self.configs]
+            changed = [name for name in configs if name in self.configs and configs[name] != self.configs[name]]
+            if not (removed or added or changed):
+                return
+            logger.info(f"🔄 MCP config changed: added={added or '-'} removed={removed or '-'} changed={changed or '-'}")
+
+            # Retired servers stay open for runs already using them until those drain
+            retired = []
+            for name in removed + changed:
+                retired.append(self.sessions.retire_server(name))
+                self.forget(name)
+                self.toolsets.pop(name, None)
+
+            built = []
+            for name in added + changed:
+                toolset = self.build(name, configs[name])
+                if toolset is not None:
+                    self.toolsets[name] = toolset
+                    built.append(name)
+            # Start new servers before new runs can see them
+            await self.sessions.start(built)
+
+            self.configs = configs
+            ordered = [self.toolsets[name] for name in configs if name in self.toolsets]
+            previous = self.registry.swap(ordered)
+            self.reloads += 1
+            self.last_error = None
+            logger.info(f"✅ MCP toolsets swapped to generation {self.registry.generation.version} "
+                        f"({len(ordered)} servers); {previous.runs} in-flight runs finish on the previous set")
+
+            servers = [server for server in retired if server is not None]
+            if servers:
+                # A removed server may also belong to generations older than the previous one
+                generations = list(self.registry.previous)
+                self._drains.append(asyncio.create_task(self._drain_and_stop(generations, servers)))
+                self._drains = [task for task in self._drains if not task.done()]
+
+    async def _drain_and_stop(self, generations: List[Any], servers: List[Any]):
+        deadline = time.monotonic() + self.drain_timeout
+        try:
+            for generation in generations:
+                if not await generation.drained(max(deadline - time.monotonic(), 0.0)):
+                    runs = sum(g.runs for g in generations)
+                    logger.warning(f"⏱️ {runs} runs still use earlier MCP toolset generations after "
+                                   f"{self.drain_timeout:g}s; stopping their removed servers anyway")
+                    break
+        finally:
+            # Also reached on shutdown, so retired servers are never leaked
+            await asyncio.gather(*(self.sessions.release_retired(server) for server in servers))
+            logger.info(f"🔌 Stopped {len(servers)} removed or replaced MCP servers")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                self.failed_reloads += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.error(f"❌ MCP config reload failed: {self.last_error}")
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop(), name="mcp-config-reload")
+            logger.info(f"👀 Watching {self.path} for MCP server changes every {self.interval:g}s")
+
+    async def stop(self):
+        tasks = [task for task in (self._task, *self._drains) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._drains = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "generation": self.registry.generation.version,
+            "servers": list(self.configs),
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error,
+        }
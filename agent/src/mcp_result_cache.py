@@ -0,0 +1,180 @@
+"""
+Read-through TTL cache for read-only MCP tool calls.
+
+Chat sessions repeat the same Kubernetes reads (get pods, describe a
+deployment) within seconds of each other. Tool calls on a per-server allowlist
+of read-only tools are cached briefly, keyed by tool name and canonicalized
+arguments. A write-classified call invalidates the cached reads whose
+namespace and resource kind it may have changed, and bumps a generation
+counter so a read that was in flight meanwhile does not store its result.
+"""
+
+import json
+import time
+import logging
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# "set" only as a whole word, so statefulset/daemonset/replicaset tools are not writes.
+# Switching the kubectl context changes what every later read returns
+DEFAULT_WRITE_PATTERNS = (
+    "*apply*", "*create*", "*delete*", "*patch*", "*scale*", "*rollout*", "*update*",
+    "*upgrade*", "*install*", "*exec*", "*generic*", "*edit*", "*label*", "*annotate*",
+    "*cordon*", "*drain*", "*restart*", "set_*", "*_set", "*_set_*", "*context*",
+)
+
+NAMESPACE_ARGS = ("namespace", "ns")
+KIND_ARGS = ("resourceType", "resource_type", "kind", "resource", "type")
+
+KIND_ALIASES = {
+    "po": "pod", "svc": "service", "deploy": "deployment", "ns": "namespace", "cm": "configmap",
+    "sts": "statefulset", "ds": "daemonset", "rs": "replicaset", "ing": "ingress", "no": "node",
+    "pvc": "persistentvolumeclaim", "pv": "persistentvolume", "sa": "serviceaccount", "cj": "cronjob",
+}
+
+# Writes to a controller also change the objects it manages
+DEPENDENT_KINDS = {
+    "deployment": ("replicaset", "pod"),
+    "replicaset": ("pod",),
+    "statefulset": ("pod",),
+    "daemonset": ("pod",),
+    "job": ("pod",),
+    "cronjob": ("job", "pod"),
+}
+
+
+def canonical_kind(kind: Optional[str]) -> Optional[str]:
+    """Normalize 'Pods', 'po' and 'deployments.apps' style kinds to a singular name"""
+    if not kind or not isinstance(kind, str):
+        return None
+    kind = kind.strip().lower().split(".")[0].split("/")[0]
+    kind = KIND_ALIASES.get(kind, kind)
+    if kind.endswith("ies"):
+        return kind[:-3] + "y"
+    if kind.endswith("sses"):
+        return kind[:-2]
+    if kind.endswith("s") and not kind.endswith("ss"):
+        return kind[:-1]
+    return kind
+
+
+def call_scope(tool_args: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """(namespace, kind) a tool call applies to; None means unknown/any"""
+    namespace = next((tool_args[k] for k in NAMESPACE_ARGS if isinstance(tool_args.get(k), str)), None)
+    kind = next((tool_args[k] for k in KIND_ARGS if isinstance(tool_args.get(k), str)), None)
+    return namespace or None, canonical_kind(kind)
+
+
+def canonical_args(tool_args: Dict[str, Any]) -> str:
+    return json.dumps(tool_args, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultCache:
+    """Per-server TTL + LRU cache of read-only tool results with scoped invalidation"""
+
+    def __init__(
+        self,
+        name: str,
+        read_only: Sequence[str],
+        write: Sequence[str] = DEFAULT_WRITE_PATTERNS,
+        ttl: float = 10.0,
+        max_entries: int = 500,
+        tool_prefix: Optional[str] = None,
+    ):
+        self.name = name
+        self.read_only = list(read_only)
+        self.write = list(write)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.tool_prefix = tool_prefix
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Optional[str], Optional[str], Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        # Bumped by every write; a read only stores its result if no write happened meanwhile
+        self.generation = 0
+        self.stale_discarded = 0
+
+    @classmethod
+    def from_config(cls, name: str, config: Dict[str, Any], tool_prefix: Optional[str] = None) -> "ToolResultCache":
+        """Build from a server's "cache" block in mcp_config.json"""
+        return cls(
+            name,
+            read_only=config.get("readOnly", []),
+            write=config.get("write", DEFAULT_WRITE_PATTERNS),
+            ttl=float(config.get("ttl", 10)),
+            max_entries=int(config.get("maxEntries", 500)),
+            tool_prefix=tool_prefix,
+        )
+
+    def _names(self, tool_name: str) -> Iterable[str]:
+        yield tool_name
+        if self.tool_prefix and tool_name.startswith(f"{self.tool_prefix}_"):
+            yield tool_name[len(self.tool_prefix) + 1:]
+
+    def _matches(self, tool_name: str, patterns: List[str]) -> bool:
+        return any(fnmatchcase(name, pattern) for name in self._names(tool_name) for pattern in patterns)
+
+    def is_read_only(self, tool_name: str) -> bool:
+        return self._matches(tool_name, self.read_only)
+
+    def is_write(self, tool_name: str) -> bool:
+        return not self.is_read_only(tool_name) and self._matches(tool_name, self.write)
+
+    def get(self, tool_name: str, tool_args: Dict[str, Any]) -> Tuple[bool, Any]:
+        """(hit, result) for a read-only call"""
+        key = (tool_name, canonical_args(tool_args))
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[3]
+
+    def set(self, tool_name: str, tool_args: Dict[str, Any], result: Any, generation: Optional[int] = None):
+        """Store a read result; `generation` is self.generation from before the call was made"""
+        if generation is not None and generation != self.generation:
+            self.stale_discarded += 1
+            return
+        namespace, kind = call_scope(tool_args)
+        key = (tool_name, canonical_args(tool_args))
+        self._entries[key] = (time.monotonic() + self.ttl, namespace, kind, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_for_write(self, tool_name: str, tool_args: Dict[str, Any]) -> int:
+        """Drop cached reads that a write with these arguments may have made stale"""
+        self.generation += 1
+        namespace, kind = call_scope(tool_args)
+        kinds = {kind, *DEPENDENT_KINDS.get(kind, ())} if kind else None
+        stale = [
+            key for key, (_, entry_ns, entry_kind, _) in self._entries.items()
+            if (namespace is None or entry_ns is None or entry_ns == namespace)
+            and (kinds is None or entry_kind is None or entry_kind in kinds)
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.invalidated += len(stale)
+        if stale:
+            logger.info(f"🧹 {tool_name} invalidated {len(stale)} cached reads on '{self.name}' "
+                        f"(namespace={namespace or '*'}, kind={kind or '*'})")
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidated": self.invalidated,
+            "stale_discarded": self.stale_discarded,
+        }
@@ -0,0 +1,187 @@
+"""
+Health supervision for MCP servers.
+
+The supervisor pings every started MCP server periodically. A server that fails
+consecutive probes is marked unhealthy, which hides its tools from new agent
+runs, and is restarted (stdio process respawned, HTTP session reconnected)
+with exponential backoff until a probe succeeds again.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from mcp_pool import StdioServerPool
+
+logger = logging.getLogger(__name__)
+
+
+async def probe_server(server: Any, timeout: float):
+    """Raise unless the server answers a ping within the timeout"""
+    if isinstance(server, StdioServerPool):
+        # The pool replaces its own bad workers; it is healthy while one is alive
+        await asyncio.wait_for(server.check_health(), timeout=timeout)
+        if not any(worker.alive for worker in server.workers):
+            raise RuntimeError(f"MCP server pool '{server.name}' has no live workers")
+        return
+    session = getattr(server, "_client", None)
+    if session is None:
+        raise RuntimeError("no open session")
+    await asyncio.wait_for(session.send_ping(), timeout=timeout)
+
+
+class ServerHealth:
+    """Probe and restart bookkeeping for one MCP server"""
+
+    def __init__(self, backoff: float):
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.probe_failures = 0
+        self.restarts = 0
+        self.restart_failures = 0
+        self.backoff = backoff
+        self.next_restart_at = 0.0
+        self.last_error: Optional[str] = None
+        self.last_probe_ms: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "consecutive_failures": self.consecutive_failures,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "restarts": self.restarts,
+            "restart_failures": self.restart_failures,
+            "next_restart_in": round(max(self.next_restart_at - time.monotonic(), 0.0), 1) if not self.healthy else None,
+            "last_error": self.last_error,
+            "last_probe_ms": self.last_probe_ms,
+        }
+
+
+class MCPSupervisor:
+    """Pings MCP servers, hides unhealthy ones and restarts them with backoff"""
+
+    def __init__(
+        self,
+        sessions: Any,
+        interval: float = 15.0,
+        probe_timeout: float = 5.0,
+        failure_threshold: int = 2,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.sessions = sessions
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.initial_backoff = backoff
+        self.max_backoff = max_backoff
+        self.health: Dict[str, ServerHealth] = {}
+        self._task: Optional[asyncio.Task] = None
+        sessions.supervisor = self
+
+    def _health(self, name: str) -> ServerHealth:
+        if name not in self.health:
+            self.health[name] = ServerHealth(self.initial_backoff)
+        return self.health[name]
+
+    def is_healthy(self, name: str) -> bool:
+        health = self.health.get(name)
+        return health is None or health.healthy
+
+    def forget(self, name: str):
+        self.health.pop(name, None)
+
+    def mark_unhealthy(self, name: str, reason: str):
+        """Hide a server's tools and schedule its restart"""
+        health = self._health(name)
+        health.last_error = reason
+        if health.healthy:
+            health.healthy = False
+            health.next_restart_at = time.monotonic() + health.backoff
+            logger.warning(f"🚑 MCP server '{name}' is unhealthy ({reason}); hiding its tools and restarting")
+
+    def _mark_healthy(self, name: str):
+        health = self._health(name)
+        if not health.healthy:
+            logger.info(f"💚 MCP server '{name}' is healthy again")
+        health.healthy = True
+        health.consecutive_failures = 0
+        health.backoff = self.initial_backoff
+
+    async def check(self, name: str):
+        """Probe one server, or try to restart it if it is unhealthy and due"""
+        health = self._health(name)
+        if not health.healthy:
+            if time.monotonic() >= health.next_restart_at:
+                await self.restart(name)
+            return
+
+        session = self.sessions.session(name)
+        health.probes += 1
+        start = time.monotonic()
+        try:
+            if session is None or not session.alive:
+                raise RuntimeError("session is not running")
+            await probe_server(session.server, self.probe_timeout)
+        except Exception as e:
+            health.probe_failures += 1
+            health.consecutive_failures += 1
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            logger.warning(f"MCP server '{name}' failed health probe "
+                           f"{health.consecutive_failures}/{self.failure_threshold}: {error}")
+            if health.consecutive_failures >= self.failure_threshold:
+                self.mark_unhealthy(name, error)
+            return
+        health.last_probe_ms = round((time.monotonic() - start) * 1000, 1)
+        health.consecutive_failures = 0
+
+    async def restart(self, name: str):
+        health = self._health(name)
+        logger.info(f"🔁 Restarting MCP server '{name}'")
+        try:
+            await self.sessions.stop_server(name)
+            await self.sessions.ensure_started(name)
+            session = self.sessions.session(name)
+            await probe_server(session.server, self.probe_timeout)
+        except Exception as e:
+            health.restart_failures += 1
+            health.last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            # Exponential backoff with jitter so several servers do not retry in lockstep
+            health.backoff = min(health.backoff * 2, self.max_backoff)
+            health.next_restart_at = time.monotonic() + health.backoff * random.uniform(0.8, 1.2)
+            logger.error(f"❌ Restart of MCP server '{name}' failed ({health.last_error}); "
+                         f"next attempt in {health.backoff:g}s")
+            return
+        health.restarts += 1
+        self._mark_healthy(name)
+
+    async def check_all(self):
+        # Lazy servers that were never started are left alone
+        names = [name for name in self.sessions.servers if self.sessions.started(name)]
+        await asyncio.gather(*(self.check(name) for name in names), return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check_all()
+            except Exception as e:
+                logger.error(f"❌ MCP supervisor error: {type(e).__name__}: {e}")
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop(), name="mcp-supervisor")
+            logger.info(f"🩺 MCP supervisor probing servers every {self.interval:g}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: health.stats() for name, health in self.health.items()}
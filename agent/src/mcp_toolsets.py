@@ -0,0 +1,654 @@
+"""
+Wrappers around the MCP toolsets loaded from mcp_config.json.
+
+Each MCP server is wrapped before it is handed to the agent so that calls to
+it go through per-server protections, its tool catalog is listed once rather
+than on every run, and the server sessions themselves are kept open for the
+lifetime of the process instead of per agent run. The wrapped toolsets are
+combined in a SwappableToolset so a config reload can replace them live.
+"""
+
+import time
+import asyncio
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Any, Awaitable, Collection, Dict, List, Optional, Sequence, Set, Tuple
+
+from mcp import types as mcp_types
+from pydantic_ai import ModelRetry
+from pydantic_ai.toolsets import AbstractToolset, CombinedToolset, WrapperToolset
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from limits import ConcurrencyLimiter, OverloadedError
+from mcp_pool import MCPWorker, StdioServerPool
+from mcp_result_cache import ToolResultCache
+from result_store import ResultStore, parse_result, result_text, summarize
+from search_compaction import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def unwrap(toolset: Any) -> Any:
+    """The innermost toolset under any wrapper toolsets"""
+    while isinstance(toolset, WrapperToolset):
+        toolset = toolset.wrapped
+    return toolset
+
+
+def server_name(server: Any) -> str:
+    """Config name of an MCP server (its toolset id), falling back to the class name"""
+    server = unwrap(server)
+    return getattr(server, "id", None) or getattr(server, "_name", None) or server.__class__.__name__
+
+
+class ToolTimeoutError(Exception):
+    """Raised when an MCP tool call exceeds its timeout"""
+
+    def __init__(self, server: str, tool: str, timeout: float):
+        super().__init__(f"Tool {tool} on MCP server '{server}' did not finish within {timeout:g}s")
+        self.server = server
+        self.tool = tool
+        self.timeout = timeout
+
+
+def is_mcp_failure(error: BaseException) -> bool:
+    """Whether an error from a tool call says the MCP server itself is unhealthy
+
+    ModelRetry means the server answered with a tool-level error, which is the
+    model's problem to fix rather than an outage.
+    """
+    return not isinstance(error, (ModelRetry, OverloadedError, CircuitOpenError))
+
+
+@dataclass
+class CircuitBreakerToolset(WrapperToolset):
+    """Short-circuits tool calls to an MCP server whose circuit is open
+
+    Rejections (open circuit, full queue) and timeouts are returned to the
+    model as results rather than raised so the model does not burn a retry on
+    them; timeouts still count as failures of the server.
+    """
+
+    breaker: CircuitBreaker
+
+    async def call_tool(self, name: str, tool_args: Dict[str, Any], ctx, tool) -> Any:
+        try:
+            return await self.breaker.call(lambda: self.wrapped.call_tool(name, tool_args, ctx, tool))
+        except CircuitOpenError as e:
+            logger.warning(f"⚡ Short-circuited MCP tool call {name}: {e}")
+            return e.to_dict()
+        except (OverloadedError, ToolTimeoutError) as e:
+            logger.warning(f"⏱️ MCP tool call {name} failed: {e}")
+            return {"error": str(e), "transient": True}
+
+
+@dataclass
+class LimitedToolset(WrapperToolset):
+    """Bounds concurrent calls to one MCP server and times out hung calls
+
+    Calls beyond the concurrency limit wait in a bounded queue; the timeout
+    for a call comes from the first tool_timeouts pattern matching the tool
+    name (with or without the server prefix), else the server-wide timeout.
+    """
+
+    limiter: ConcurrencyLimiter
+    timeout: Optional[float] = None
+    tool_timeouts: Dict[str, float] = field(default_factory=dict)
+    tool_prefix: Optional[str] = None
+
+    def __post_init__(self):
+        self.timeouts = 0
+
+    def timeout_for(self, name: str) -> Optional[float]:
+        names = [name]
+        if self.tool_prefix and name.startswith(f"{self.tool_prefix}_"):
+            names.append(name[len(self.tool_prefix) + 1:])
+        for pattern, timeout in self.tool_timeouts.items():
+            if any(fnmatchcase(candidate, pattern) for candidate in names):
+                return timeout
+        return self.timeout
+
+    async def call_tool(self, name: str, tool_args: Dict[str, Any], ctx, tool) -> Any:
+        timeout = self.timeout_for(name)
+        async with self.limiter.slot():
+            try:
+                return await asyncio.wait_for(self.wrapped.call_tool(name, tool_args, ctx, tool), timeout=timeout or None)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise ToolTimeoutError(server_name(self.wrapped), name, timeout) from None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.limiter.stats(),
+            "timeout": self.timeout,
+            "tool_timeouts": self.tool_timeouts,
+            "timeouts": self.timeouts,
+        }
+
+
+@dataclass
+class ResultCacheToolset(WrapperToolset):
+    """Serves repeated read-only tool calls from a short-lived cache
+
+    Write-classified calls invalidate the cached reads they may have changed,
+    both before and after they run, and reads that overlapped a write are not
+    stored, so no stale read is cached in between.
+    """
+
+    cache: ToolResultCache
+
+    async def call_tool(self, name: str, tool_args: Dict[str, Any], ctx, tool) -> Any:
+        if self.cache.is_read_only(name):
+            hit, result = self.cache.get(name, tool_args)
+            if hit:
+                logger.info(f"⚡ Cache hit for MCP tool {name}")
+                return result
+            generation = self.cache.generation
+            result = await self.wrapped.call_tool(name, tool_args, ctx, tool)
+            # Open-circuit and timeout placeholders are not real results
+            if not (isinstance(result, dict) and (result.get("circuit") or result.get("transient"))):
+                self.cache.set(name, tool_args, result, generation=generation)
+            return result
+
+        if self.cache.is_write(name):
+            self.cache.invalidate_for_write(name, tool_args)
+            try:
+                return await self.wrapped.call_tool(name, tool_args, ctx, tool)
+            finally:
+                self.cache.invalidate_for_write(name, tool_args)
+
+        return await self.wrapped.call_tool(name, tool_args, ctx, tool)
+
+
+@dataclass
+class LargeResultToolset(WrapperToolset):
+    """Keeps oversized tool results out of the model context
+
+    A result longer than max_chars is put in the result store; the model
+    gets its shape, a short preview and a handle for mcp_result_query, which
+    pages through it in chunks of the same max_chars.
+    """
+
+    store: ResultStore
+    max_chars: int = 20000
+
+    def __post_init__(self):
+        self.offloaded = 0
+        self.chars_offloaded = 0
+
+    async def call_tool(self, name: str, tool_args: Dict[str, Any], ctx, tool) -> Any:
+        result = await self.wrapped.call_tool(name, tool_args, ctx, tool)
+        text = result_text(result)
+        if len(text) <= self.max_chars:
+            return result
+        handle = await self.store.put(text, page_chars=self.max_chars)
+        self.offloaded += 1
+        self.chars_offloaded += len(text)
+        logger.info(f"📦 Stored {len(text)} chars from MCP tool {name} as {handle}")
+        return {
+            "handle": handle,
+            "tool": name,
+            "size_chars": len(text),
+            "estimated_tokens": estimate_tokens(text),
+            **summarize(parse_result(text)),
+            "note": (
+                "The full result was too large to return. Call mcp_result_query with this handle "
+                "to page through it, filter records by text or select fields."
+            ),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"max_chars": self.max_chars, "offloaded": self.offloaded, "chars_offloaded": self.chars_offloaded}
+
+
+@dataclass
+class CachedCatalogToolset(WrapperToolset):
+    """Caches an MCP server's tool catalog across agent runs
+
+    The catalog is fetched once and reused until the server sends a
+    tools/list_changed notification or its session is replaced (reconnect,
+    restart or pool worker recycling). The JSON schema payload served by the
+    /tools endpoint is built together with the catalog.
+    """
+
+    def __post_init__(self):
+        self._tools: Optional[Dict[str, Any]] = None
+        self._catalog: List[Dict[str, Any]] = []
+        self._marker: Tuple[int, ...] = ()
+        self.hits = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    def _sessions(self) -> List[Any]:
+        """Live client sessions of the wrapped server (one per pool worker)"""
+        target = unwrap(self.wrapped)
+        if isinstance(target, StdioServerPool):
+            servers = [worker.server for worker in target.workers]
+        else:
+            servers = [target]
+        return [session for session in (getattr(server, "_client", None) for server in servers) if session is not None]
+
+    def _watch_list_changed(self, session: Any):
+        """Chain a handler onto the session that invalidates on tools/list_changed
+
+        pydantic-ai creates the mcp ClientSession itself and does not expose its
+        message_handler argument, so the handler attribute is wrapped instead.
+        The mcp version is pinned in pyproject.toml and tests/test_mcp_catalog.py
+        fails if the notification no longer reaches this hook.
+        """
+        if getattr(session, "_catalog_watched", False):
+            return
+        handler = getattr(session, "_message_handler", None)
+        if handler is None:
+            logger.warning(f"⚠️ Cannot watch tools/list_changed for '{server_name(self.wrapped)}': "
+                           f"mcp ClientSession has no message handler; the tool catalog is refreshed "
+                           f"only when the session changes")
+            session._catalog_watched = True
+            return
+
+        async def on_message(message):
+            if isinstance(getattr(message, "root", None), mcp_types.ToolListChangedNotification):
+                self.invalidate("tools/list_changed notification")
+            await handler(message)
+
+        session._message_handler = on_message
+        session._catalog_watched = True
+
+    def invalidate(self, reason: str):
+        if self._tools is not None:
+            self.invalidations += 1
+            logger.info(f"🔄 Tool catalog of '{server_name(self.wrapped)}' invalidated: {reason}")
+        self._tools = None
+
+    async def get_tools(self, ctx) -> Dict[str, Any]:
+        sessions = self._sessions()
+        marker = tuple(id(session) for session in sessions)
+        if self._tools is not None and marker == self._marker:
+            self.hits += 1
+            return self._tools
+
+        if self._tools is not None:
+            self.invalidate("session changed")
+        tools = await self.wrapped.get_tools(ctx)
+        for session in self._sessions():
+            self._watch_list_changed(session)
+        self._tools = tools
+        self._marker = tuple(id(session) for session in self._sessions())
+        self._catalog = [
+            {
+                "name": name,
+                "description": tool.tool_def.description,
+                "parameters": tool.tool_def.parameters_json_schema,
+            }
+            for name, tool in sorted(tools.items())
+        ]
+        self.refreshes += 1
+        logger.info(f"📚 Cached {len(tools)} tools from MCP server '{server_name(self.wrapped)}'")
+        return tools
+
+    async def catalog(self) -> List[Dict[str, Any]]:
+        """Tool names, descriptions and JSON schemas, loading them if needed"""
+        # MCP servers do not use the run context to list their tools
+        await self.get_tools(None)
+        return self._catalog
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached": self._tools is not None,
+            "tools": len(self._tools or {}),
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "invalidations": self.invalidations,
+        }
+
+
+class MCPSessionManager:
+    """Keeps MCP server sessions open for the lifetime of the process
+
+    MCP servers are reference counted: while the manager holds a server open,
+    agent runs entering and exiting it only adjust the count, so stdio
+    processes and HTTP sessions are initialized once instead of per chat turn.
+
+    Eager servers are started concurrently at app startup, each under its own
+    timeout; lazy servers are started on first use by ManagedSessionToolset. Every
+    session is owned by its own task (see MCPWorker) so servers can be started
+    and stopped independently.
+    """
+
+    def __init__(
+        self,
+        servers: Sequence[Any] = (),
+        lazy: Collection[str] = (),
+        startup_timeout: float = 30.0,
+        startup_timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.startup_timeout = startup_timeout
+        self.startup_timeouts = dict(startup_timeouts or {})
+        self.servers: Dict[str, Any] = {}
+        self.lazy: Set[str] = set()
+        self.status: Dict[str, Dict[str, Any]] = {}
+        self._sessions: Dict[str, MCPWorker] = {}
+        # id(server) -> (server, session) of servers retired by a config reload,
+        # kept open for the runs still pinned to them until they are released
+        self._retired: Dict[int, Tuple[Any, Optional[MCPWorker]]] = {}
+        self._attempted: Set[str] = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # id(server) -> tool calls in flight on it, cancelled before its session is stopped
+        self._calls: Dict[int, Set[asyncio.Task]] = {}
+        self._interrupted: Set[asyncio.Task] = set()
+        # Set by MCPSupervisor; startup failures are handed to it for retrying
+        self.supervisor: Optional[Any] = None
+        for server in servers:
+            self.add_server(server, lazy=server_name(server) in lazy)
+
+    def add_server(self, server: Any, lazy: bool = False, startup_timeout: Optional[float] = None):
+        """Register a server; it is started by start(), or on first use if lazy"""
+        name = server_name(server)
+        self.servers[name] = server
+        if lazy:
+            self.lazy.add(name)
+        if startup_timeout is not None:
+            self.startup_timeouts[name] = float(startup_timeout)
+        self.status[name] = {"running": False, "lazy": lazy}
+        self._locks[name] = asyncio.Lock()
+
+    def retire_server(self, name: str) -> Optional[Any]:
+        """Take a server out of the configuration, returning it for release_retired()
+
+        New runs no longer see the server and a server with the same name may
+        be added right away, but the retired server's session stays open for
+        the runs that started with it until release_retired() stops it.
+        """
+        server = self.servers.pop(name, None)
+        self.lazy.discard(name)
+        self.startup_timeouts.pop(name, None)
+        self.status.pop(name, None)
+        self._locks.pop(name, None)
+        self._attempted.discard(name)
+        if self.supervisor is not None:
+            self.supervisor.forget(name)
+        session = self._sessions.pop(name, None)
+        if server is not None:
+            self._retired[id(server)] = (server, session)
+        return server
+
+    async def release_retired(self, server: Any):
+        """Stop a retired server once no run uses it any more"""
+        _, session = self._retired.pop(id(server), (None, None))
+        if session is not None:
+            await self._interrupt_calls(server)
+            await session.stop()
+
+    async def start(self, names: Optional[Collection[str]] = None):
+        """Start every eager server (or the eager ones among names) concurrently"""
+        names = self.servers if names is None else names
+        eager = [name for name in names if name in self.servers and name not in self.lazy]
+        lazy = [name for name in names if name in self.lazy]
+        start = time.monotonic()
+        await asyncio.gather(*(self.ensure_started(name) for name in eager), return_exceptions=True)
+        if eager:
+            started = [name for name in eager if name in self.running()]
+            logger.info(f"🔌 Started {len(started)}/{len(eager)} eager MCP servers in {time.monotonic() - start:.2f}s")
+        if lazy:
+            logger.info(f"💤 Lazy MCP servers (started on first use): {', '.join(sorted(lazy))}")
+
+    async def ensure_started(self, name: str):
+        """Open the session for a server unless it is already running"""
+        if name not in self.servers:
+            raise KeyError(f"MCP server '{name}' is not configured")
+        async with self._locks[name]:
+            session = self._sessions.get(name)
+            if session is not None and session.alive:
+                return
+            self._attempted.add(name)
+            timeout = self.startup_timeouts.get(name, self.startup_timeout)
+            session = MCPWorker(self.servers[name], index=0)
+            start = time.monotonic()
+            try:
+                await session.start(timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"❌ MCP server '{name}' did not start within {timeout:g}s")
+                self._startup_failed(name, f"startup timed out after {timeout:g}s")
+                raise
+            except Exception as e:
+                logger.error(f"❌ Failed to start MCP server '{name}': {type(e).__name__}: {e}")
+                self._startup_failed(name, f"{type(e).__name__}: {e}")
+                raise
+            elapsed = time.monotonic() - start
+            if self.servers.get(name) is not session.server:
+                # Retired (config reload) while it was starting
+                await session.stop()
+                return
+            self._sessions[name] = session
+            self.status[name].update(running=True, error=None, startup_seconds=round(elapsed, 3))
+            logger.info(f"🔌 MCP server '{name}' session opened in {elapsed:.2f}s")
+
+    def _startup_failed(self, name: str, error: str):
+        if name in self.status:
+            self.status[name].update(running=False, error=error)
+        if self.supervisor is not None and name in self.servers:
+            self.supervisor.mark_unhealthy(name, error)
+
+    def session(self, name: str) -> Optional[MCPWorker]:
+        return self._sessions.get(name)
+
+    def is_retired(self, server: Any) -> bool:
+        return id(server) in self._retired
+
+    def session_of(self, server: Any) -> Optional[MCPWorker]:
+        """The session of this server object, current or retired (not of its successor)"""
+        retired = self._retired.get(id(server))
+        if retired is not None:
+            return retired[1]
+        name = server_name(server)
+        session = self._sessions.get(name)
+        return session if session is not None and session.server is server else None
+
+    def started(self, name: str) -> bool:
+        """Whether a start of the server has been attempted (lazy servers may not have been)"""
+        return name in self._attempted
+
+    def available(self, name: str) -> bool:
+        """Whether runs may use the server's tools"""
+        return self.supervisor is None or self.supervisor.is_healthy(name)
+
+    async def call(self, server: Any, name: str, call: Awaitable[Any]) -> Any:
+        """Run a tool call on a server as its own task, so stopping the session can fail it
+
+        A call holds a reference on the MCP server while it runs. Were the
+        session stopped under it, the process would stay up until the call
+        returned, a restart would reuse the hung session, and the call would
+        finally close the session from the wrong task. Stopping a session
+        therefore cancels its calls first; they return an error result.
+        """
+        task = asyncio.ensure_future(call)
+        calls = self._calls.setdefault(id(server), set())
+        calls.add(task)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task not in self._interrupted:
+                raise
+            message = f"MCP server '{server_name(server)}' was restarted while {name} was running"
+            logger.warning(f"⚠️ {message}")
+            return {"error": message, "transient": True}
+        finally:
+            calls.discard(task)
+            self._interrupted.discard(task)
+
+    async def _interrupt_calls(self, server: Any, timeout: float = 5.0):
+        """Cancel the tool calls in flight on a server and wait for them to let go of it"""
+        calls = self._calls.pop(id(server), set())
+        for task in calls:
+            self._interrupted.add(task)
+            task.cancel()
+        if calls:
+            logger.warning(f"⚠️ Cancelling {len(calls)} in-flight calls on MCP server '{server_name(server)}'")
+            await asyncio.wait(calls, timeout=timeout)
+
+    async def stop_server(self, name: str):
+        session = self._sessions.pop(name, None)
+        if session is not None:
+            await self._interrupt_calls(session.server)
+            await session.stop()
+        if name in self.status:
+            self.status[name]["running"] = False
+
+    async def stop(self):
+        retired = [server for server, _ in self._retired.values()]
+        await asyncio.gather(
+            *(self.stop_server(name) for name in list(self._sessions)),
+            *(self.release_retired(server) for server in retired),
+        )
+        logger.info("🔌 MCP sessions closed")
+
+    def running(self) -> List[str]:
+        return [name for name, session in self._sessions.items() if session.alive]
+
+
+@dataclass
+class ManagedSessionToolset(WrapperToolset):
+    """Ties a run's use of an MCP server to the session manager
+
+    Lazy servers are started on first use here. The session itself belongs to
+    the manager, so runs do not hold a reference on the server: that way the
+    supervisor can close and reopen it while runs are in flight; calls still
+    waiting on the old session are failed by the manager (see
+    MCPSessionManager.call). Tools of a server the supervisor considers
+    unhealthy are hidden until it recovers.
+
+    The toolset is bound to its server object, not to the server's name: after
+    a config reload replaces the server, runs of the previous generation keep
+    using the retired server's session until the reloader releases it.
+    """
+
+    sessions: MCPSessionManager
+
+    async def __aenter__(self):
+        server = unwrap(self.wrapped)
+        if self.sessions.is_retired(server):
+            # Never restart a server that a config reload removed or replaced
+            return self
+        name = server_name(server)
+        if self.sessions.available(name):
+            try:
+                await self.sessions.ensure_started(name)
+            except Exception:
+                # Logged by the manager; the server's tools are left out of this run
+                pass
+        return self
+
+    async def __aexit__(self, *args) -> Optional[bool]:
+        return None
+
+    async def call_tool(self, name: str, tool_args: Dict[str, Any], ctx, tool) -> Any:
+        return await self.sessions.call(unwrap(self.wrapped), name, self.wrapped.call_tool(name, tool_args, ctx, tool))
+
+    async def get_tools(self, ctx) -> Dict[str, Any]:
+        server = unwrap(self.wrapped)
+        session = self.sessions.session_of(server)
+        if session is None:
+            return {}
+        if not self.sessions.is_retired(server) and not self.sessions.available(server_name(server)):
+            return {}
+        return await self.wrapped.get_tools(ctx)
+
+
+# Toolset generation the current agent run entered, chained to any outer run's
+_run_generation: ContextVar[Optional[Tuple["ToolsetGeneration", Any]]] = ContextVar("mcp_run_generation", default=None)
+
+
+class ToolsetGeneration:
+    """One immutable set of MCP toolsets, with a count of the runs using it"""
+
+    def __init__(self, version: int, toolsets: Sequence[Any]):
+        self.version = version
+        self.toolsets = list(toolsets)
+        self.combined = CombinedToolset(self.toolsets)
+        self.runs = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def acquire(self):
+        self.runs += 1
+        self._idle.clear()
+
+    def release(self):
+        self.runs -= 1
+        if self.runs <= 0:
+            self.runs = 0
+            self._idle.set()
+
+    async def drained(self, timeout: float) -> bool:
+        """Wait until no run uses this generation; False if the timeout passed first"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class SwappableToolset(AbstractToolset):
+    """MCP toolsets that can be replaced while the agent is serving
+
+    Each agent run is pinned to the generation that was current when it
+    entered the toolset, so a swap only affects runs started afterwards and
+    in-flight runs finish on the toolsets they started with.
+    """
+
+    def __init__(self, toolsets: Sequence[Any] = ()):
+        self.generation = ToolsetGeneration(1, toolsets)
+        # Earlier generations that may still have runs in flight
+        self.previous: List[ToolsetGeneration] = []
+
+    @property
+    def id(self) -> Optional[str]:
+        return "mcp"
+
+    @property
+    def label(self) -> str:
+        return f"SwappableToolset(generation={self.generation.version}, toolsets={len(self.generation.toolsets)})"
+
+    def swap(self, toolsets: Sequence[Any]) -> ToolsetGeneration:
+        """Make toolsets current for new runs and return the previous generation"""
+        previous = self.generation
+        self.generation = ToolsetGeneration(previous.version + 1, toolsets)
+        # Only the current generation gains runs, so an idle earlier one stays idle
+        self.previous = [generation for generation in self.previous if generation.runs] + [previous]
+        return previous
+
+    def _current(self) -> ToolsetGeneration:
+        entered = _run_generation.get()
+        return entered[0] if entered is not None else self.generation
+
+    async def __aenter__(self):
+        generation = self.generation
+        generation.acquire()
+        try:
+            await generation.combined.__aenter__()
+        except BaseException:
+            generation.release()
+            raise
+        _run_generation.set((generation, _run_generation.get()))
+        return self
+
+    async def __aexit__(self, *args) -> Optional[bool]:
+        entered = _run_generation.get()
+        if entered is None:
+            return None
+        generation, outer = entered
+        _run_generation.set(outer)
+        try:
+            await generation.combined.__aexit__(*args)
+        finally:
+            generation.release()
+        return None
+
+    async def get_tools(self, ctx) -> Dict[str, Any]:
+        return await self._current().combined.get_tools(ctx)
+
+    async def call_tool(self, name: str, tool_args: Dict[str, Any], ctx, tool) -> Any:
+        # The tool remembers which toolset of its generation produced it
+        return await self._current().combined.call_tool(name, tool_args, ctx, tool)
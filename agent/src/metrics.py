@@ -0,0 +1,45 @@
+"""
+Lightweight in-process metrics helpers.
+
+Rolling latency windows used for percentile estimates (hedging delays, queue
+wait times) and exposed as JSON on the /metrics endpoint.
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """Rolling window of durations in seconds with percentile lookups"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile (0-100) of the current window, or None if empty"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 4) if value is not None else None
+
+        return {
+            "count": self.count,
+            "avg": rounded(self.total / self.count) if self.count else None,
+            "p50": rounded(self.percentile(50)),
+            "p95": rounded(self.percentile(95)),
+            "max": rounded(self.max) if self.count else None,
+        }
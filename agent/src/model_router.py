@@ -0,0 +1,178 @@
+"""
+Two-tier model routing.
+
+Most model requests in a chat are cheap: picking a tool, filling in its
+arguments after a validation retry, or giving a short answer. Only turns that
+combine a lot of material (large tool results, a request for an explanation
+or a report) need a stronger model. Whether a prompt asks for synthesis is
+judged from the conversation's latest user prompt: a long prompt or one that
+asks for synthesis goes to the strong tier from the request that carries it,
+since the model may answer it without calling any tool. Other prompts start on
+the fast tier, and the requests that follow tool calls escalate when the tool
+results are large.
+"""
+
+import re
+import time
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Sequence, Tuple
+
+from pydantic_ai.messages import ModelRequest, RetryPromptPart, ToolReturnPart, UserPromptPart
+from pydantic_ai.models.wrapper import WrapperModel
+
+from metrics import LatencyTracker
+from prompt_cache import stream_usage
+from result_store import result_text
+
+logger = logging.getLogger(__name__)
+
+# Wording that asks for an explanation or a write-up rather than a lookup
+SYNTHESIS_KEYWORDS = (
+    "explain", "why", "summarize", "summarise", "summary", "compare", "comparison", "analyze", "analyse",
+    "analysis", "report", "overview", "in detail", "troubleshoot", "root cause", "recommend", "pros and cons",
+    "write",
+)
+
+
+class TierStats:
+    """Request, token and latency counters for one tier"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.reasons: Counter = Counter()
+        self.latency = LatencyTracker()
+
+    def record(self, usage: Any, latency: float):
+        self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+        self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+        self.latency.record(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "reasons": dict(self.reasons),
+            "latency": self.latency.stats(),
+        }
+
+
+class ModelRouter(WrapperModel):
+    """Sends each request to the fast model, or to the strong model for synthesis
+
+    The fast model is the wrapped model, so the agent sees its name and
+    profile; both tiers are expected to be from the same provider family.
+    """
+
+    def __init__(
+        self,
+        fast: Any,
+        strong: Any,
+        synthesis_chars: int = 6000,
+        long_prompt_chars: int = 1500,
+        keywords: Sequence[str] = SYNTHESIS_KEYWORDS,
+    ):
+        super().__init__(fast)
+        self.strong = strong
+        self.synthesis_chars = synthesis_chars
+        self.long_prompt_chars = long_prompt_chars
+        self._keyword_patterns = [
+            re.compile(r"(?<!\w)" + re.escape(keyword) + r"(?!\w)") for keyword in keywords
+        ]
+        self.tiers = {"fast": TierStats(fast.model_name), "strong": TierStats(strong.model_name)}
+
+    @staticmethod
+    def latest_prompt(messages: Sequence[Any]) -> str:
+        """Text of the conversation's latest user prompt"""
+        for message in reversed(messages):
+            if isinstance(message, ModelRequest):
+                parts = [part for part in message.parts if isinstance(part, UserPromptPart)]
+                if parts:
+                    return " ".join(
+                        part.content if isinstance(part.content, str)
+                        else " ".join(c for c in part.content if isinstance(c, str))
+                        for part in parts
+                    )
+        return ""
+
+    def synthesis_reason(self, prompt: str) -> Tuple[str, str]:
+        """(reason, detail) when a prompt asks for long synthesis, else ("", "")"""
+        if len(prompt) >= self.long_prompt_chars:
+            return "long prompt", f"{len(prompt)} chars"
+        lowered = prompt.lower()
+        if any(pattern.search(lowered) for pattern in self._keyword_patterns):
+            return "synthesis request", ""
+        return "", ""
+
+    def classify(self, messages: Sequence[Any]) -> Tuple[str, str, str]:
+        """(tier, reason, detail) for the newest request in the conversation"""
+        request = messages[-1] if messages and isinstance(messages[-1], ModelRequest) else None
+        if request is None:
+            return "fast", "no request", ""
+        if any(isinstance(part, RetryPromptPart) for part in request.parts):
+            return "fast", "argument retry", ""
+
+        reason, detail = self.synthesis_reason(self.latest_prompt(messages))
+        if any(isinstance(part, UserPromptPart) for part in request.parts):
+            if reason:
+                # It may be answered right away, without any tool call
+                return "strong", reason, detail
+            return "fast", "short prompt", ""
+
+        returned = [part for part in request.parts if isinstance(part, ToolReturnPart)]
+        chars = sum(len(result_text(part.content)) for part in returned)
+        if chars >= self.synthesis_chars:
+            return "strong", "large tool results", f"{chars} chars"
+        if reason:
+            return "strong", f"{reason} after tools", detail
+        return "fast", "small tool results", f"{chars} chars"
+
+    def _route(self, messages: Sequence[Any]) -> Tuple[str, Any]:
+        try:
+            tier, reason, detail = self.classify(messages)
+        except Exception as e:
+            logger.error(f"❌ Model routing failed, using the fast model: {type(e).__name__}: {e}")
+            tier, reason, detail = "fast", "error", ""
+        stats = self.tiers[tier]
+        stats.requests += 1
+        stats.reasons[reason] += 1
+        logger.info(f"🔀 Model router: {tier} tier ({stats.model_name}) - {reason}"
+                    f"{f' ({detail})' if detail else ''}")
+        return tier, self.wrapped if tier == "fast" else self.strong
+
+    def _record(self, tier: str, usage: Any, elapsed: float):
+        stats = self.tiers[tier]
+        stats.record(usage, elapsed)
+        logger.info(f"🔀 {tier} tier ({stats.model_name}): {elapsed:.2f}s, "
+                    f"{getattr(usage, 'input_tokens', 0) or 0} input / "
+                    f"{getattr(usage, 'output_tokens', 0) or 0} output tokens")
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        tier, model = self._route(messages)
+        start = time.monotonic()
+        response = await model.request(messages, model_settings, model_request_parameters)
+        self._record(tier, response.usage, time.monotonic() - start)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(self, messages, model_settings, model_request_parameters, run_context=None):
+        tier, model = self._route(messages)
+        start = time.monotonic()
+        async with model.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            yield stream
+        self._record(tier, stream_usage(stream), time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "synthesis_chars": self.synthesis_chars,
+            "long_prompt_chars": self.long_prompt_chars,
+            "tiers": {tier: stats.stats() for tier, stats in self.tiers.items()},
+        }
@@ -0,0 +1,145 @@
+"""
+Query-focused passage extraction from Tavily raw page content.
+
+The full page text returned with include_raw_content=True is split into
+passages, ranked against the query with BM25, and only the best passages are
+attached to each search result. A small adaptive policy tracks which query
+terms tend to produce useful passages and stops asking Tavily for raw content
+(which costs extra latency) for queries that do not benefit from it.
+"""
+
+import re
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence
+
+from bm25 import BM25, tokenize
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+
+def chunk_text(text: str, chunk_words: int = 60) -> List[str]:
+    """Split text into passages of roughly chunk_words words on sentence boundaries"""
+    chunks: List[str] = []
+    current: List[str] = []
+    count = 0
+    for sentence in _SENTENCE_END.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        words = len(sentence.split())
+        if current and count + words > chunk_words:
+            chunks.append(" ".join(current))
+            current, count = [], 0
+        current.append(sentence)
+        count += words
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class PassageExtractor:
+    """Picks the passages of each page that best match the query"""
+
+    def __init__(self, passages_per_result: int = 2, chunk_words: int = 60, min_score: float = 1.0):
+        self.passages_per_result = passages_per_result
+        self.chunk_words = chunk_words
+        self.min_score = min_score
+
+    @property
+    def enabled(self) -> bool:
+        return self.passages_per_result > 0
+
+    def extract(self, query: str, raw_contents: Sequence[str]) -> List[List[str]]:
+        """Return the top passages for each raw page, best first
+
+        All pages are ranked in one BM25 index so that term rarity is judged
+        across the whole result set rather than within a single page.
+        """
+        query_terms = tokenize(query)
+        page_chunks = [chunk_text(raw or "", self.chunk_words) for raw in raw_contents]
+        owners = [page for page, chunks in enumerate(page_chunks) for _ in chunks]
+        flat = [chunk for chunks in page_chunks for chunk in chunks]
+        passages: List[List[str]] = [[] for _ in raw_contents]
+        if not flat or not query_terms:
+            return passages
+
+        index = BM25([tokenize(chunk) for chunk in flat])
+        ranked = sorted(enumerate(index.scores(query_terms)), key=lambda item: item[1], reverse=True)
+        for i, score in ranked:
+            if score < self.min_score:
+                break
+            page = owners[i]
+            if len(passages[page]) < self.passages_per_result:
+                passages[page].append(flat[i])
+        return passages
+
+
+class RawContentPolicy:
+    """Learns per query term whether requesting raw page content pays off
+
+    Each observation updates an exponentially weighted usefulness score for
+    the query's terms. A query is searched without raw content when its known
+    terms score below min_useful_ratio; every explore_every-th such query still
+    requests raw content so the estimate can recover.
+    """
+
+    def __init__(
+        self,
+        min_useful_ratio: float = 0.3,
+        min_observations: int = 3,
+        explore_every: int = 10,
+        alpha: float = 0.3,
+        max_terms: int = 5000,
+    ):
+        self.min_useful_ratio = min_useful_ratio
+        self.min_observations = min_observations
+        self.explore_every = explore_every
+        self.alpha = alpha
+        self.max_terms = max_terms
+        self._terms: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._skipped = 0
+        self.requested = 0
+        self.skipped = 0
+
+    def predicted_usefulness(self, query: str) -> float:
+        """Mean usefulness of the query's terms that have enough history (1.0 if none)"""
+        known = [
+            self._terms[term][0]
+            for term in set(tokenize(query))
+            if term in self._terms and self._terms[term][1] >= self.min_observations
+        ]
+        return sum(known) / len(known) if known else 1.0
+
+    def should_request(self, query: str) -> bool:
+        if self.predicted_usefulness(query) >= self.min_useful_ratio:
+            self.requested += 1
+            return True
+        self._skipped += 1
+        if self.explore_every and self._skipped % self.explore_every == 0:
+            self.requested += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def record(self, query: str, useful: bool):
+        value = 1.0 if useful else 0.0
+        for term in set(tokenize(query)):
+            entry = self._terms.get(term)
+            if entry is None:
+                self._terms[term] = [value, 1]
+            else:
+                entry[0] += self.alpha * (value - entry[0])
+                entry[1] += 1
+                self._terms.move_to_end(term)
+        while len(self._terms) > self.max_terms:
+            self._terms.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "raw_content_requested": self.requested,
+            "raw_content_skipped": self.skipped,
+            "tracked_terms": len(self._terms),
+        }
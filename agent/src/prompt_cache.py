@@ -0,0 +1,128 @@
+"""
+Provider prompt caching support.
+
+OpenAI-compatible providers discount (and speed up) the part of a prompt
+that repeats the prefix of a recent request byte for byte: the tool
+definitions, then the system prompt, then the conversation so far. MCP
+servers may list their tools in any order and with schema keys in any order
+after a reconnect, so tool definitions are put in a canonical order and form
+before every request.
+
+UsageTrackingModel records the cached input tokens the provider reports for
+each request, so hit ratios and the latency difference between requests with
+and without a cache hit can be watched per model.
+"""
+
+import time
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from typing import Any, Dict, List, Sequence
+
+from pydantic_ai.models.wrapper import WrapperModel
+
+from metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_schema(value: Any) -> Any:
+    """JSON value with object keys sorted recursively (list order is kept)"""
+    if isinstance(value, dict):
+        return {key: canonical_schema(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [canonical_schema(item) for item in value]
+    return value
+
+
+def stable_tool_defs(tool_defs: Sequence[Any]) -> List[Any]:
+    """Tool definitions sorted by name with canonical schemas"""
+    return [
+        replace(tool_def, parameters_json_schema=canonical_schema(tool_def.parameters_json_schema))
+        for tool_def in sorted(tool_defs, key=lambda tool_def: tool_def.name)
+    ]
+
+
+def stream_usage(stream: Any) -> Any:
+    """Usage of a finished stream (a method in older pydantic-ai releases, a property in newer ones)"""
+    usage = stream.usage
+    return usage() if callable(usage) else usage
+
+
+class ModelUsageStats:
+    """Token and latency counters for one model"""
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        # First-response latency of requests with and without cached input tokens
+        self.hit_latency = LatencyTracker()
+        self.miss_latency = LatencyTracker()
+
+    def record(self, usage: Any, latency: float):
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        cached_tokens = getattr(usage, "cache_read_tokens", 0) or 0
+        self.requests += 1
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens
+        self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+        if cached_tokens:
+            self.cache_hits += 1
+            self.hit_latency.record(latency)
+        else:
+            self.miss_latency.record(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        hit, miss = self.hit_latency.stats(), self.miss_latency.stats()
+        saved = miss["avg"] - hit["avg"] if hit["avg"] is not None and miss["avg"] is not None else None
+        return {
+            "requests": self.requests,
+            "requests_with_cache_hit": self.cache_hits,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_token_ratio": round(self.cached_tokens / self.input_tokens, 4) if self.input_tokens else 0.0,
+            "latency_with_cache_hit": hit,
+            "latency_without_cache_hit": miss,
+            "estimated_saved_seconds_per_request": round(saved, 4) if saved is not None else None,
+        }
+
+
+class UsageTrackingModel(WrapperModel):
+    """Records provider-reported token usage, including cached tokens, per request
+
+    Latency is measured to the first response: for streamed requests the
+    stream is open once the provider has sent its first chunk.
+    """
+
+    def __init__(self, wrapped: Any, usage: Dict[str, ModelUsageStats]):
+        super().__init__(wrapped)
+        self.usage = usage
+
+    def _record(self, response_usage: Any, latency: float):
+        name = self.wrapped.model_name
+        self.usage.setdefault(name, ModelUsageStats()).record(response_usage, latency)
+        input_tokens = getattr(response_usage, "input_tokens", 0) or 0
+        cached_tokens = getattr(response_usage, "cache_read_tokens", 0) or 0
+        share = f" ({cached_tokens / input_tokens:.0%})" if input_tokens else ""
+        logger.info(f"🧮 {name}: {input_tokens} input tokens, {cached_tokens} cached{share}, "
+                    f"{getattr(response_usage, 'output_tokens', 0) or 0} output, first response in {latency:.2f}s")
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        start = time.monotonic()
+        response = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        self._record(response.usage, time.monotonic() - start)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(self, messages, model_settings, model_request_parameters, run_context=None):
+        start = time.monotonic()
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            first_response = time.monotonic() - start
+            yield stream
+        self._record(stream_usage(stream), first_response)
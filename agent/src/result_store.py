@@ -0,0 +1,309 @@
+"""
+Out-of-band store for oversized MCP tool results.
+
+A result larger than the configured threshold is not sent to the model.
+It is kept here under an opaque handle and the model gets a compact summary
+instead; the mcp_result_query tool pages, filters and projects the stored
+result on demand. Entries live in memory up to a byte budget, older ones
+spill to disk up to a second budget, and all of them expire after a TTL.
+"""
+
+import os
+import json
+import asyncio
+import time
+import secrets
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keys under which Kubernetes-style list responses keep their items
+LIST_KEYS = ("items", "resources", "results", "data")
+
+
+def result_text(result: Any) -> str:
+    """The text a tool result is sent to the model as"""
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, default=str, ensure_ascii=False)
+
+
+def parse_result(text: str) -> Any:
+    """Decode a JSON result, leaving other text as it is"""
+    stripped = text.lstrip()
+    if stripped[:1] in ("{", "["):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return text
+
+
+def result_items(value: Any) -> Tuple[List[Any], Optional[str]]:
+    """The list of records in a result and where they came from
+
+    JSON lists are used as they are, list responses by their item key, and
+    plain text (kubectl tables, logs) is split into lines.
+    """
+    if isinstance(value, list):
+        return value, "list"
+    if isinstance(value, dict):
+        for key in LIST_KEYS:
+            if isinstance(value.get(key), list):
+                return value[key], key
+        return [value], "object"
+    return str(value).splitlines(), "lines"
+
+
+def project(item: Any, fields: Sequence[str]) -> Any:
+    """Pick dotted field paths (e.g. "metadata.name", "status.phase") from a record"""
+    if not isinstance(item, dict):
+        return item
+    projected = {}
+    for path in fields:
+        value: Any = item
+        for part in path.split("."):
+            if isinstance(value, dict):
+                value = value.get(part)
+            elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+                value = value[int(part)]
+            else:
+                value = None
+                break
+        projected[path] = value
+    return projected
+
+
+def clip(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max(max_chars, 0)] + "..."
+
+
+def summarize(value: Any, preview_items: int = 3, preview_chars: int = 1500) -> Dict[str, Any]:
+    """Shape of a result: record count, field names and a short sample
+
+    The sample is at most about preview_chars long however long the
+    records are, header line included.
+    """
+    items, source = result_items(value)
+    summary: Dict[str, Any] = {"format": "lines" if source == "lines" else "json", "total_items": len(items)}
+    if source == "lines":
+        header = clip(items[0], preview_chars) if items else ""
+        budget = preview_chars - len(header)
+        preview = []
+        for line in items[1:preview_items + 1]:
+            if budget <= 0:
+                break
+            line = clip(line, budget)
+            preview.append(line)
+            budget -= len(line)
+        summary["header"] = header
+        summary["preview"] = preview
+    else:
+        if source not in ("list", "object"):
+            summary["items_key"] = source
+        keys = sorted({key for item in items[:50] if isinstance(item, dict) for key in item})
+        if keys:
+            summary["fields"] = keys
+        summary["preview"] = clip(json.dumps(items[:preview_items], default=str, ensure_ascii=False), preview_chars)
+    return summary
+
+
+def query_result(
+    text: str,
+    offset: int = 0,
+    limit: int = 50,
+    contains: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+    max_chars: int = 20000,
+) -> Dict[str, Any]:
+    """One page of a stored result's records, optionally filtered and projected
+
+    The page is cut short if it would exceed max_chars so that paging never
+    reproduces the oversized result it exists to avoid.
+    """
+    items, source = result_items(parse_result(text))
+    header = None
+    if source == "lines" and items:
+        # Keep the table header (kubectl output) with every page
+        header, items = items[0], items[1:]
+    if contains:
+        needle = contains.lower()
+        items = [item for item in items if needle in result_text(item).lower()]
+    offset = max(offset, 0)
+    page, used = [], 0
+    for item in items[offset:offset + max(limit, 1)]:
+        if fields and source != "lines":
+            item = project(item, fields)
+        size = len(result_text(item)) + 2
+        if page and used + size > max_chars:
+            break
+        if not page and size > max_chars:
+            # A single record larger than a page: return it truncated
+            item = result_text(item)[:max_chars] + "..."
+            size = max_chars
+        page.append(item)
+        used += size
+    next_offset = offset + len(page)
+    response: Dict[str, Any] = {"header": header} if header is not None else {}
+    return {
+        **response,
+        "matched": len(items),
+        "offset": offset,
+        "items": page,
+        "next_offset": next_offset if next_offset < len(items) else None,
+    }
+
+
+class ResultStore:
+    """Handle -> stored result text, bounded in memory and spilling to disk
+
+    Spill files are written, read and removed in a worker thread so large
+    results do not block the event loop.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 3600.0,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = spill_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        # handle -> (expires_at, text, page_chars); least recently used first
+        self._memory: "OrderedDict[str, Tuple[float, str, Optional[int]]]" = OrderedDict()
+        # handle -> (expires_at, size, page_chars) of spilled entries, oldest first
+        self._disk: "OrderedDict[str, Tuple[float, int, Optional[int]]]" = OrderedDict()
+        # handle -> entry while its spill file is being written
+        self._spilling: Dict[str, Tuple[float, str, Optional[int]]] = {}
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.stored = 0
+        self.spilled = 0
+        self.evicted = 0
+        self.reads = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            # Handles do not survive a restart, but other workers or replicas may
+            # share the directory: only files past the TTL are certainly orphaned
+            cutoff = time.time() - ttl
+            for name in os.listdir(spill_dir):
+                if name.startswith("res_") and name.endswith(".txt"):
+                    path = os.path.join(spill_dir, name)
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                    except OSError:
+                        pass
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.spill_dir, f"{handle}.txt")
+
+    async def put(self, text: str, page_chars: Optional[int] = None) -> str:
+        """Store a result; page_chars is the page size get() hands back for querying it"""
+        await self._expire()
+        handle = f"res_{secrets.token_hex(8)}"
+        self._memory[handle] = (time.monotonic() + self.ttl, text, page_chars)
+        self.memory_bytes += len(text.encode("utf-8"))
+        self.stored += 1
+        await self._enforce_memory()
+        return handle
+
+    async def get(self, handle: str) -> Optional[Tuple[str, Optional[int]]]:
+        """(text, page_chars) of a stored result, or None if the handle is unknown or expired"""
+        await self._expire()
+        entry = self._memory.get(handle) or self._spilling.get(handle)
+        if entry is not None:
+            if handle in self._memory:
+                self._memory.move_to_end(handle)
+            self.reads += 1
+            return entry[1], entry[2]
+        if handle in self._disk:
+            page_chars = self._disk[handle][2]
+            try:
+                text = await asyncio.to_thread(self._read, handle)
+            except OSError as e:
+                logger.warning(f"Spilled result {handle} is unreadable: {e}")
+                await self._drop_disk([handle])
+                return None
+            self.reads += 1
+            return text, page_chars
+        return None
+
+    def _read(self, handle: str) -> str:
+        with open(self._path(handle), encoding="utf-8") as f:
+            return f.read()
+
+    def _write(self, handle: str, text: str):
+        with open(self._path(handle), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _remove(self, handles: Sequence[str]):
+        for handle in handles:
+            try:
+                os.remove(self._path(handle))
+            except OSError:
+                pass
+
+    async def _enforce_memory(self):
+        while self.memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            handle, entry = self._memory.popitem(last=False)
+            expires_at, text, page_chars = entry
+            size = len(text.encode("utf-8"))
+            self.memory_bytes -= size
+            if not self.spill_dir or size > self.max_disk_bytes:
+                self.evicted += 1
+                continue
+            self._spilling[handle] = entry
+            try:
+                await asyncio.to_thread(self._write, handle, text)
+            except OSError as e:
+                logger.warning(f"Could not spill result {handle} to disk: {e}")
+                self.evicted += 1
+                continue
+            finally:
+                self._spilling.pop(handle, None)
+            self._disk[handle] = (expires_at, size, page_chars)
+            self.disk_bytes += size
+            self.spilled += 1
+            excess, overflow = self.disk_bytes - self.max_disk_bytes, []
+            for old_handle, (_, old_size, _) in self._disk.items():
+                if excess <= 0:
+                    break
+                overflow.append(old_handle)
+                excess -= old_size
+            if overflow:
+                self.evicted += len(overflow)
+                await self._drop_disk(overflow)
+
+    async def _drop_disk(self, handles: Sequence[str]):
+        handles = [handle for handle in handles if handle in self._disk]
+        for handle in handles:
+            _, size, _ = self._disk.pop(handle)
+            self.disk_bytes -= size
+        await asyncio.to_thread(self._remove, handles)
+
+    async def _expire(self):
+        now = time.monotonic()
+        for handle in [h for h, (expires_at, _, _) in self._memory.items() if expires_at <= now]:
+            _, text, _ = self._memory.pop(handle)
+            self.memory_bytes -= len(text.encode("utf-8"))
+        expired = [h for h, (expires_at, _, _) in self._disk.items() if expires_at <= now]
+        if expired:
+            await self._drop_disk(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self.memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self.disk_bytes,
+            "stored": self.stored,
+            "spilled": self.spilled,
+            "evicted": self.evicted,
+            "reads": self.reads,
+        }
@@ -0,0 +1,91 @@
+"""
+In-process TTL + LRU cache for web search responses.
+
+Queries are normalized (case, whitespace, punctuation) so that trivially
+different phrasings of the same question share one entry. Entries hold the
+fully built response object, so a hit skips both the network round trip and
+the Pydantic model construction.
+"""
+
+import re
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query into a cache key"""
+    query = _PUNCTUATION.sub(" ", query.casefold())
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class SearchCache(Generic[T]):
+    """Bounded LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, max_size: int = 256, ttl: float = 900.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, query: str) -> Optional[T]:
+        """Return the cached value for a query, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, query: str, value: T, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries if full"""
+        if not self.enabled:
+            return
+        key = normalize_query(query)
+        self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for logging and metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
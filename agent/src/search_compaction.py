@@ -0,0 +1,142 @@
+"""
+Token-budgeted compaction of web search results.
+
+Before search results are handed back to the model, near-duplicate snippets
+are dropped, the remaining results are ranked by relevance, and their text is
+trimmed at sentence boundaries so the whole payload fits a token budget.
+Extracted page passages share each result's slice of the budget with its
+snippet. Titles and URLs are always kept so the model can still cite its sources.
+"""
+
+import re
+import logging
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    """Word n-grams used for near-duplicate detection"""
+    words = _WORD.findall(text.casefold())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def result_tokens(result: Any) -> int:
+    """Token estimate for a result's snippet plus any extracted passages"""
+    return estimate_tokens(result.content) + sum(estimate_tokens(p) for p in getattr(result, "passages", []))
+
+
+def jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def trim_to_sentences(text: str, max_tokens: int) -> str:
+    """Keep whole leading sentences that fit in max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept: List[str] = []
+    used = 0
+    for sentence in _SENTENCE_END.split(text.strip()):
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return " ".join(kept)
+    # A single over-long first sentence: hard cut on a word boundary, leaving
+    # room for the ellipsis so the result stays within max_tokens
+    cut = text[:max_tokens * 4 - 1].rsplit(" ", 1)[0]
+    return f"{cut}…" if cut else ""
+
+
+class SearchCompactor:
+    """Ranks, dedupes and trims search results to a token budget"""
+
+    def __init__(self, token_budget: int = 1200, dedupe_threshold: float = 0.8):
+        self.token_budget = token_budget
+        self.dedupe_threshold = dedupe_threshold
+        self.calls = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.duplicates_dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.token_budget > 0
+
+    def compact(self, results: Sequence[Any]) -> Tuple[List[Any], int]:
+        """Return compacted copies of results and the number of tokens saved
+
+        Results are Pydantic models with title, url, content and score fields
+        and an optional passages list.
+        """
+        before = sum(result_tokens(r) for r in results)
+        if not self.enabled or not results:
+            return list(results), 0
+
+        ranked = sorted(results, key=lambda r: r.score, reverse=True)
+        unique = []
+        seen: List[Set] = []
+        for result in ranked:
+            fingerprint = shingles(result.content)
+            if any(jaccard(fingerprint, other) >= self.dedupe_threshold for other in seen):
+                self.duplicates_dropped += 1
+                logger.debug(f"Dropping near-duplicate result: {result.url}")
+                continue
+            seen.append(fingerprint)
+            unique.append(result)
+
+        # Spread the budget over the results in rank order; whatever a short
+        # snippet does not use is handed on to the ones after it
+        compacted = []
+        remaining = self.token_budget
+        for i, result in enumerate(unique):
+            share = remaining // (len(unique) - i)
+            content = trim_to_sentences(result.content, share)
+            update: Dict[str, Any] = {"content": content}
+            used = estimate_tokens(content)
+            if getattr(result, "passages", None):
+                kept = []
+                for passage in result.passages:
+                    if share - used <= 0:
+                        break
+                    passage = trim_to_sentences(passage, share - used)
+                    if not passage:
+                        break
+                    kept.append(passage)
+                    used += estimate_tokens(passage)
+                update["passages"] = kept
+            remaining -= used
+            compacted.append(result.model_copy(update=update))
+
+        after = sum(result_tokens(r) for r in compacted)
+        saved = max(before - after, 0)
+        self.calls += 1
+        self.tokens_in += before
+        self.tokens_out += after
+        return compacted, saved
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "calls": self.calls,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_in - self.tokens_out,
+            "duplicates_dropped": self.duplicates_dropped,
+        }
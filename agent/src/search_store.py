@@ -0,0 +1,137 @@
+"""
+Persistent SQLite store for web search responses.
+
+Backs the in-process search cache with a file that survives container
+restarts and is shared by every uvicorn worker on the host. The database runs
+in WAL mode with a busy timeout so several processes can read and write it
+concurrently; expired rows and the least recently used overflow are purged
+periodically to keep the file bounded.
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_cache_expires_at ON search_cache (expires_at);
+CREATE INDEX IF NOT EXISTS search_cache_accessed_at ON search_cache (accessed_at);
+"""
+
+
+class SearchStore:
+    """SQLite-backed key/value store with TTL expiry and size-bounded compaction"""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 3600.0,
+        max_entries: int = 5000,
+        compact_every: int = 100,
+        busy_timeout: float = 5.0,
+        label: str = "Search store",
+    ):
+        self.path = path
+        # Names the store in log messages when it backs a cache other than web search
+        self.label = label
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.compact_every = compact_every
+        self.busy_timeout = busy_timeout
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._writes = 0
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+        logger.info(f"{self.label} opened at {path} (TTL {ttl:.0f}s, max {max_entries} entries)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections are not thread-safe"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT payload FROM search_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        conn.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def set_sync(self, key: str, payload: str, ttl: Optional[float] = None):
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO search_cache (key, payload, created_at, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, payload, now, expires_at, now),
+        )
+        self._writes += 1
+        if self._writes % self.compact_every == 0:
+            self.compact_sync()
+
+    def compact_sync(self) -> int:
+        """Drop expired rows, then the least recently used rows above max_entries"""
+        conn = self._connection()
+        removed = conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        removed += conn.execute(
+            "DELETE FROM search_cache WHERE key IN ("
+            "SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        if removed:
+            logger.info(f"{self.label} compacted: removed {removed} entries")
+        return removed
+
+    async def get(self, key: str) -> Optional[str]:
+        """Fetch a live payload, treating database errors as a miss"""
+        try:
+            return await asyncio.to_thread(self.get_sync, key)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"{self.label} read failed: {e}")
+            return None
+
+    async def set(self, key: str, payload: str, ttl: Optional[float] = None):
+        """Store a payload; failures are logged and otherwise ignored"""
+        try:
+            await asyncio.to_thread(self.set_sync, key, payload, ttl)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"{self.label} write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
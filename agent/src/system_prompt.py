@@ -0,0 +1,170 @@
+"""
+System prompt assembled from the toolsets that are actually loaded.
+
+The prompt describes web search (always available) plus one fragment per
+capability of the configured MCP servers, so the model is never told about
+tools that do not exist and no tokens are spent describing them. A server's
+capabilities are taken from its "promptFragments" list in mcp_config.json,
+or detected from its name, command and URL. Fragments are always emitted in
+the same order so the prompt stays byte-stable for provider prompt caching.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from search_compaction import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+INTRO = (
+    "You are a helpful AI assistant with access to multiple tools. "
+    "Choose the appropriate tool based on the user's request:"
+)
+
+SEARCH_SECTION = """**Web Search (tavily_search)** - Use when the user wants to SEARCH for information:
+   - Keywords: "search", "find", "look up", "what's happening", "latest news", "research"
+   - Examples: "Search for latest AI developments", "Find information about...", "What's new in..."
+   - Use for: Current events, news, research topics, general information discovery
+   - When a question needs several searches, call tavily_search_many once with all queries"""
+
+# Capability -> numbered guideline section, or a one-line entry under "Additional MCP Tools"
+FRAGMENTS: Dict[str, Dict[str, Any]] = {
+    "kubernetes": {
+        "label": "Kubernetes",
+        "detect": ("k8s", "kube"),
+        "section": """**Kubernetes Operations (MCP)** - Use when the user wants to interact with a Kubernetes cluster:
+   - Keywords: "kubectl", "kubernetes", "k8s", "pods", "services", "deployments", "namespaces", "CRDs", "custom resources"
+   - Resource Management: Query supported resource types (built-in and custom resources)
+   - Read Operations: get resource details, list resources with filtering, describe resources
+   - Write Operations: create, update, delete resources (fine-grained control available)
+   - Examples: "Get pods in namespace", "List deployments", "Describe service", "Create configmap", "Delete pod"
+   - Supports: All Kubernetes resource types including custom resources, namespace filtering
+   - Connection: Uses kubeconfig for cluster authentication""",
+        "instructions": (
+            "For Kubernetes requests: Use the appropriate MCP tools for cluster operations",
+            "When using Kubernetes tools, specify namespace when needed (default to 'default' if not specified)",
+        ),
+    },
+    "helm": {
+        "label": "Helm",
+        "detect": ("k8s", "kube", "helm"),
+        "section": """**Helm Operations (MCP)** - Use when the user wants to manage Helm charts and releases:
+   - Keywords: "helm", "charts", "releases", "repositories", "install", "upgrade", "uninstall"
+   - Release Management: list, get, install, upgrade, uninstall Helm releases
+   - Repository Management: list, add, remove Helm repositories
+   - Examples: "List helm releases", "Install chart", "Upgrade release", "Add helm repo\"""",
+        "instructions": (
+            "For Helm operations, consider asking for release names, chart names, or repository details as needed",
+        ),
+    },
+    "fetch": {
+        "label": "fetch",
+        "detect": ("fetch",),
+        "section": """**Fetch Tool (MCP)** - Use when the user wants to FETCH content from a specific URL:
+   - Keywords: "fetch", "get content from", "retrieve from URL", "download", "scrape"
+   - Examples: "Fetch content from https://...", "Get the content of this webpage", "Retrieve data from..."
+   - Use for: Getting specific webpage content, downloading data from URLs""",
+        "instructions": ("For fetch requests: Use the MCP fetch tool to retrieve specific URL content",),
+    },
+    "python": {
+        "detect": ("python", "pyodide"),
+        "additional": "Python code execution for calculations and data processing",
+    },
+    "memory": {
+        "detect": ("memory",),
+        "additional": "Memory storage for remembering information across conversations",
+    },
+    "filesystem": {
+        "detect": ("filesystem",),
+        "additional": "File operations for saving/loading data",
+    },
+    "github": {
+        "detect": ("github",),
+        "additional": "GitHub operations for repository management",
+    },
+}
+
+DIRECT_SECTION = """**Direct LLM Response** - Use when the request doesn't involve {capabilities}:
+   - General questions, explanations, analysis of provided text
+   - Math problems, coding help, creative writing, advice
+   - Processing or analyzing content the user has already provided
+   - Examples: "Explain how...", "Write a story about...", "Calculate...", "Help me understand...\""""
+
+LEADING_INSTRUCTIONS = (
+    "Always choose the most appropriate tool based on the user's intent",
+    "For search requests: Use tavily_search and provide comprehensive results with citations",
+)
+
+TRAILING_INSTRUCTIONS = (
+    "For general questions: Respond directly using your knowledge without tools",
+    "Be conversational, helpful, and thorough in your responses",
+    "If uncertain about tool choice, ask the user to clarify their intent",
+)
+
+RESULT_HANDLE_INSTRUCTION = (
+    'If a tool result comes back as a "handle" with a summary, use mcp_result_query '
+    "to read only the records or fields you need"
+)
+
+
+def server_fragments(name: str, config: Dict[str, Any]) -> List[str]:
+    """Prompt fragments for one MCP server: configured, or detected from how it is run"""
+    if "promptFragments" in config:
+        return [fragment for fragment in config["promptFragments"] if fragment in FRAGMENTS]
+    haystack = " ".join(
+        [name, str(config.get("command", "")), " ".join(map(str, config.get("args", []))), str(config.get("url", ""))]
+    ).lower()
+    return [fragment for fragment, spec in FRAGMENTS.items() if any(word in haystack for word in spec["detect"])]
+
+
+def build_system_prompt(servers: Iterable[Tuple[str, Dict[str, Any]]]) -> Tuple[str, List[str]]:
+    """(system prompt, fragments used) for the given (name, config) MCP servers"""
+    servers = list(servers)
+    wanted = {fragment for name, config in servers for fragment in server_fragments(name, config)}
+    fragments = [fragment for fragment in FRAGMENTS if fragment in wanted]
+    custom = sorted(config["prompt"] for _, config in servers if isinstance(config.get("prompt"), str))
+
+    sections = [SEARCH_SECTION] + [FRAGMENTS[f]["section"] for f in fragments if "section" in FRAGMENTS[f]]
+    labels = ["search"] + [FRAGMENTS[f]["label"] for f in fragments if "label" in FRAGMENTS[f]]
+    capabilities = ", ".join(labels[:-1]) + f", or {labels[-1]}" if len(labels) > 2 else " or ".join(labels)
+    sections.append(DIRECT_SECTION.format(capabilities=capabilities))
+
+    lines = [INTRO, "", "**Tool Selection Guidelines:**", ""]
+    for number, section in enumerate(sections, 1):
+        lines += [f"{number}. {section}", ""]
+
+    additional = [FRAGMENTS[f]["additional"] for f in fragments if "additional" in FRAGMENTS[f]] + custom
+    if additional:
+        lines += ["**Additional MCP Tools:**", *(f"- {line}" for line in additional), ""]
+
+    instructions = list(LEADING_INSTRUCTIONS)
+    instructions += [line for f in fragments for line in FRAGMENTS[f].get("instructions", ())]
+    if servers:
+        instructions.append(RESULT_HANDLE_INSTRUCTION)
+    instructions += TRAILING_INSTRUCTIONS
+    lines += ["**Instructions:**", *(f"- {line}" for line in instructions)]
+    return "\n".join(lines), fragments
+
+
+class SystemPromptBuilder:
+    """Builds the prompt for the current server set, reusing it while the set is unchanged"""
+
+    def __init__(self):
+        self._key: Tuple[str, ...] = ()
+        self._prompt = ""
+        self.fragments: List[str] = []
+        self.tokens = 0
+
+    def prompt(self, servers: Sequence[Tuple[str, Dict[str, Any]]]) -> str:
+        key = tuple(sorted(f"{name}:{sorted(server_fragments(name, config))}:{config.get('prompt', '')}"
+                           for name, config in servers))
+        if key != self._key or not self._prompt:
+            self._prompt, self.fragments = build_system_prompt(sorted(servers, key=lambda server: server[0]))
+            self._key = key
+            self.tokens = estimate_tokens(self._prompt)
+            logger.info(f"📝 System prompt: ~{self.tokens} tokens "
+                        f"(fragments: {', '.join(['search', *self.fragments])})")
+        return self._prompt
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tokens": self.tokens, "chars": len(self._prompt), "fragments": ["search", *self.fragments]}
@@ -0,0 +1,95 @@
+"""
+Asyncio-native Tavily search client.
+
+Talks to the Tavily REST API over a single pooled httpx.AsyncClient that is
+shared by the whole process, so concurrent web searches reuse keep-alive
+connections instead of borrowing threads and paying a TLS handshake per call.
+"""
+
+import os
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+from http_pool import PooledHttpClient
+
+logger = logging.getLogger(__name__)
+
+TAVILY_API_URL = "https://api.tavily.com"
+
+
+class TavilySearchError(Exception):
+    """Raised when the Tavily API returns an error response"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AsyncTavilySearch:
+    """Tavily search over one shared, pooled HTTP client"""
+
+    def __init__(self, api_key: str, base_url: str = TAVILY_API_URL, **pool_settings: Any):
+        self.base_url = base_url
+        self._api_key = api_key
+        self._http = PooledHttpClient(
+            "Tavily",
+            base_url=base_url,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            **pool_settings,
+        )
+
+    @classmethod
+    def from_env(cls) -> "AsyncTavilySearch":
+        """Build a client from TAVILY_* environment variables"""
+        return cls(
+            api_key=os.getenv("TAVILY_API_KEY", ""),
+            base_url=os.getenv("TAVILY_API_URL", TAVILY_API_URL),
+            **PooledHttpClient.env_settings("TAVILY", max_connections=20, max_keepalive_connections=10, read_timeout=60),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared httpx client, created on first use"""
+        return self._http.client
+
+    async def search(
+        self,
+        query: str,
+        search_depth: str = "advanced",
+        include_answer: bool = True,
+        max_results: int = 5,
+        include_raw_content: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Run a Tavily search and return the decoded JSON payload"""
+        payload = {
+            "query": query,
+            "search_depth": search_depth,
+            "include_answer": include_answer,
+            "max_results": max_results,
+            "include_raw_content": include_raw_content,
+        }
+        request_timeout = httpx.Timeout(timeout, connect=self._http.timeout.connect) if timeout else httpx.USE_CLIENT_DEFAULT
+        response = await self.client.post("/search", json=payload, timeout=request_timeout)
+
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("detail", {})
+                message = detail.get("error") if isinstance(detail, dict) else str(detail)
+            except ValueError:
+                message = None
+            raise TavilySearchError(
+                f"Tavily API returned {response.status_code}: {message or response.text[:200]}",
+                status_code=response.status_code,
+            )
+
+        return response.json()
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        await self._http.aclose()
@@ -0,0 +1,264 @@
+"""
+Per-turn tool subset selection.
+
+Every tool definition sent with a model request costs prompt tokens, and most
+turns only need one family of tools. The router looks at the recent user
+prompts and keeps the tools that match a keyword group (the same groups the
+system prompt describes) or rank highly under BM25 over tool names and
+descriptions. Tools already used in the conversation stay available. When
+nothing matches with confidence the full tool set is sent unchanged.
+
+Routing is per conversation, not per request: the subset is the union of the
+selections for every user prompt so far, so it never shrinks and stays byte
+for byte the same through a prompt's tool calls, which keeps the provider's
+prompt cache prefix (tool definitions first) intact. A follow-up prompt that
+needs a new tool family still grows the subset; that request loses the cached
+prefix, and the estimated tokens lost are reported next to the tokens saved.
+"""
+
+import re
+import json
+import logging
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, ToolCallPart, UserPromptPart
+
+from bm25 import BM25, tokenize
+from search_compaction import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Keyword groups from the system prompt's tool selection guidelines -> tool name patterns
+DEFAULT_GROUPS: Dict[str, Dict[str, Sequence[str]]] = {
+    "search": {
+        "keywords": ("search", "find", "look up", "latest", "news", "research", "what's happening", "current"),
+        "tools": ("tavily_search*",),
+    },
+    "kubernetes": {
+        "keywords": (
+            "kubectl", "kubernetes", "k8s", "pod", "pods", "service", "services", "deployment", "deployments",
+            "namespace", "namespaces", "crd", "crds", "custom resource", "node", "nodes", "configmap", "secret",
+            "cluster", "container", "logs", "replicaset", "statefulset", "daemonset", "ingress", "crashloopbackoff",
+        ),
+        "tools": ("*kubectl*", "*k8s*", "*kubernetes*"),
+    },
+    "helm": {
+        "keywords": ("helm", "chart", "charts", "release", "releases", "repository", "repositories", "install",
+                     "upgrade", "uninstall"),
+        "tools": ("*helm*",),
+    },
+    "fetch": {
+        "keywords": ("fetch", "url", "http://", "https://", "download", "scrape", "webpage", "retrieve"),
+        "tools": ("*fetch*",),
+    },
+}
+
+
+def _terms(text: str) -> List[str]:
+    """BM25 terms with "_"/"-" treated as separators and a crude plural fold"""
+    terms = tokenize(re.sub(r"[_\-./]", " ", text))
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t for t in terms]
+
+
+def _keyword_pattern(keyword: str) -> re.Pattern:
+    return re.compile(r"(?<!\w)" + re.escape(keyword.lower()) + r"(?!\w)")
+
+
+def tool_tokens(tool_def: Any) -> int:
+    """Estimated prompt tokens of one tool definition"""
+    payload = json.dumps(
+        {"name": tool_def.name, "description": tool_def.description, "parameters": tool_def.parameters_json_schema},
+        sort_keys=True, default=str,
+    )
+    return estimate_tokens(payload)
+
+
+def conversation_context(messages: Sequence[Any], prompt: Any = None) -> Tuple[List[str], Set[str]]:
+    """The user prompts of the conversation in order and the names of tools already called"""
+    prompts: List[str] = []
+    called: Set[str] = set()
+    for message in messages:
+        if isinstance(message, ModelRequest):
+            for part in message.parts:
+                if isinstance(part, UserPromptPart):
+                    content = part.content
+                    prompts.append(content if isinstance(content, str) else " ".join(c for c in content if isinstance(c, str)))
+        elif isinstance(message, ModelResponse):
+            called.update(part.tool_name for part in message.parts if isinstance(part, ToolCallPart))
+    if isinstance(prompt, str) and (not prompts or prompts[-1] != prompt):
+        prompts.append(prompt)
+    return prompts, called
+
+
+def history_tokens(messages: Sequence[Any]) -> int:
+    """Estimated prompt tokens of the conversation before the newest request"""
+    total = 0
+    for message in messages[:-1]:
+        for part in getattr(message, "parts", ()):
+            content = getattr(part, "content", None)
+            if content is None:
+                content = getattr(part, "args", None)
+            if content is not None:
+                total += estimate_tokens(content if isinstance(content, str) else json.dumps(content, default=str))
+    return total
+
+
+class ToolRouter:
+    """Chooses the tool definitions sent with each model request"""
+
+    def __init__(
+        self,
+        groups: Optional[Dict[str, Dict[str, Sequence[str]]]] = None,
+        always: Sequence[str] = (),
+        top_k: int = 8,
+        min_score: float = 1.0,
+        relative_score: float = 0.3,
+        last_prompts: int = 3,
+        enabled: bool = True,
+    ):
+        self.groups = groups if groups is not None else DEFAULT_GROUPS
+        self.always = set(always)
+        self.top_k = top_k
+        self.min_score = min_score
+        self.relative_score = relative_score
+        self.last_prompts = last_prompts
+        self.enabled = enabled
+        self._keyword_patterns = {
+            name: [_keyword_pattern(keyword) for keyword in group["keywords"]] for name, group in self.groups.items()
+        }
+        self._index_key: Optional[Tuple[Tuple[str, str], ...]] = None
+        self._index: Optional[BM25] = None
+        # Selection per prompt window, so earlier prompts of a conversation are not re-scored every request
+        self._selections: Dict[str, Optional[frozenset]] = {}
+        self.requests = 0
+        self.routed = 0
+        self.fallbacks = 0
+        self.tools_offered = 0
+        self.tools_sent = 0
+        self.tokens_saved = 0
+        self.subset_changes = 0
+        self.cache_tokens_lost = 0
+
+    def _bm25(self, tool_defs: Sequence[Any]) -> BM25:
+        # Rebuilt only when the tool set changes (e.g. after an MCP config reload)
+        key = tuple((t.name, t.description or "") for t in tool_defs)
+        if key != self._index_key:
+            self._index = BM25([_terms(f"{name} {description}") for name, description in key])
+            self._index_key = key
+            self._selections.clear()
+        return self._index
+
+    def matched_groups(self, text: str) -> List[str]:
+        lowered = text.lower()
+        return [
+            name for name, patterns in self._keyword_patterns.items()
+            if any(pattern.search(lowered) for pattern in patterns)
+        ]
+
+    def select(self, tool_defs: Sequence[Any], text: str, called: Set[str] = frozenset()) -> Tuple[List[Any], Dict[str, Any]]:
+        """(tool definitions to send, routing decision)"""
+        names = [t.name for t in tool_defs]
+        groups = self.matched_groups(text)
+        selected = {
+            name for group in groups for name in names
+            if any(fnmatchcase(name, pattern) for pattern in self.groups[group]["tools"])
+        }
+
+        scores = self._bm25(tool_defs).scores(_terms(text)) if text else [0.0] * len(tool_defs)
+        best = max(scores, default=0.0)
+        ranked = []
+        if best >= self.min_score:
+            ranked = [
+                names[i] for i in sorted(range(len(names)), key=lambda i: -scores[i])[:self.top_k]
+                if scores[i] >= best * self.relative_score
+            ]
+            selected.update(ranked)
+
+        if not selected:
+            return list(tool_defs), {"fallback": "no confident match", "groups": groups}
+        selected |= (self.always | called) & set(names)
+        chosen = [t for t in tool_defs if t.name in selected]
+        return chosen, {"groups": groups, "bm25": ranked}
+
+    def _selected_names(self, tool_defs: Sequence[Any], text: str) -> Optional[frozenset]:
+        """Names selected for one prompt window, or None when it falls back to all tools"""
+        self._bm25(tool_defs)
+        if text not in self._selections:
+            if len(self._selections) >= 1024:
+                self._selections.clear()
+            chosen, decision = self.select(tool_defs, text)
+            self._selections[text] = None if "fallback" in decision else frozenset(t.name for t in chosen)
+        return self._selections[text]
+
+    def select_for_conversation(
+        self, tool_defs: Sequence[Any], prompts: Sequence[str], called: Set[str] = frozenset(),
+    ) -> Tuple[List[Any], Dict[str, Any], Optional[Set[str]]]:
+        """(tool definitions to send, routing decision, names sent before the newest prompt)
+
+        The subset is the union of the selections for each user prompt so far,
+        each scored with the prompts just before it, so it only ever grows.
+        """
+        names = {t.name for t in tool_defs}
+        extra = (self.always | called) & names
+        groups = self.matched_groups(" ".join(prompts[-self.last_prompts:]))
+        union: Set[str] = set()
+        previous: Optional[Set[str]] = None
+        for i in range(len(prompts)):
+            if i == len(prompts) - 1 and i > 0:
+                previous = union | extra
+            window = " ".join(prompts[max(0, i + 1 - self.last_prompts):i + 1])
+            selected = self._selected_names(tool_defs, window)
+            if selected is None:
+                # Once the full tool set has been sent in a conversation it stays
+                return list(tool_defs), {"fallback": "no confident match", "groups": groups}, previous
+            union |= selected
+        if not union:
+            return list(tool_defs), {"fallback": "no prompt", "groups": groups}, None
+        chosen = [t for t in tool_defs if t.name in union | extra]
+        return chosen, {"groups": groups}, previous
+
+    async def prepare_tools(self, ctx: Any, tool_defs: List[Any]) -> List[Any]:
+        """Agent prepare_tools hook: filter the tool definitions for this model request"""
+        self.requests += 1
+        self.tools_offered += len(tool_defs)
+        if not self.enabled or not tool_defs:
+            self.tools_sent += len(tool_defs)
+            return tool_defs
+        try:
+            prompts, called = conversation_context(ctx.messages, getattr(ctx, "prompt", None))
+            chosen, decision, previous = self.select_for_conversation(tool_defs, prompts, called)
+        except Exception as e:
+            logger.error(f"❌ Tool routing failed, sending all tools: {type(e).__name__}: {e}")
+            chosen, decision, previous = list(tool_defs), {"fallback": "error"}, None
+        self.tools_sent += len(chosen)
+        chosen_names = {t.name for t in chosen}
+        if previous is not None and previous != chosen_names and any(isinstance(m, ModelResponse) for m in ctx.messages):
+            # The tool block changed since the last prompt: the cached prefix after it is gone
+            lost = sum(tool_tokens(t) for t in chosen) + history_tokens(ctx.messages)
+            self.subset_changes += 1
+            self.cache_tokens_lost += lost
+            logger.info(f"🧭 Tool router: tool subset grew to {len(chosen)} tools, ~{lost} cached prompt tokens lost")
+        if "fallback" in decision:
+            self.fallbacks += 1
+            logger.info(f"🧭 Tool router: sending all {len(tool_defs)} tools ({decision['fallback']})")
+            return chosen
+        saved = sum(tool_tokens(t) for t in tool_defs if t.name not in chosen_names)
+        self.routed += 1
+        self.tokens_saved += saved
+        logger.info(f"🧭 Tool router: sending {len(chosen)}/{len(tool_defs)} tools "
+                    f"(groups={decision['groups'] or '-'}, ~{saved} schema tokens saved)")
+        return chosen
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+            "avg_tools_offered": round(self.tools_offered / self.requests, 1) if self.requests else 0.0,
+            "avg_tools_sent": round(self.tools_sent / self.requests, 1) if self.requests else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "subset_changes": self.subset_changes,
+            "cache_tokens_lost": self.cache_tokens_lost,
+        }
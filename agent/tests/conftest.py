@@ -0,0 +1,25 @@
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+from pydantic_ai.mcp import MCPServerStdio
+
+import mcp_pool
+
+FAKE_SERVER = Path(__file__).parent / "fake_mcp_server.py"
+
+
+@pytest.fixture
+def fake_server():
+    """Factory for stdio server definitions that run the fake MCP server"""
+    def build(name: str = "fake", **kwargs) -> MCPServerStdio:
+        return MCPServerStdio(sys.executable, [str(FAKE_SERVER)], id=name, timeout=30, **kwargs)
+    return build
+
+
+@pytest.fixture(autouse=True)
+def spawn_lock():
+    # Each test runs its own event loop; the module-level lock must not outlive it
+    mcp_pool._spawn_lock = asyncio.Lock()
+    yield
@@ -0,0 +1,48 @@
+"""
+Minimal stdio MCP server used by the tests.
+
+Run as `python fake_mcp_server.py`. Besides a few trivial tools it can add a
+tool at runtime and announce it with a tools/list_changed notification.
+FAKE_STARTUP_DELAY (seconds) delays answering the initialize handshake, like a
+cold `uvx` start.
+"""
+
+import os
+import time
+import asyncio
+
+from mcp.server.fastmcp import Context, FastMCP
+
+mcp = FastMCP("fake")
+
+
+@mcp.tool()
+def echo(text: str) -> str:
+    """Return the text unchanged"""
+    return text
+
+
+@mcp.tool()
+def pid() -> int:
+    """Process id of this server"""
+    return os.getpid()
+
+
+@mcp.tool()
+async def sleep(seconds: float) -> str:
+    """Wait, then answer (keeps a call in flight)"""
+    await asyncio.sleep(seconds)
+    return "done"
+
+
+@mcp.tool()
+async def add_tool(name: str, ctx: Context) -> str:
+    """Register a new tool and send tools/list_changed"""
+    mcp.add_tool(lambda: name, name=name, description=f"Added at runtime: {name}")
+    await ctx.session.send_tool_list_changed()
+    return name
+
+
+if __name__ == "__main__":
+    time.sleep(float(os.environ.get("FAKE_STARTUP_DELAY", "0")))
+    mcp.run()
@@ -0,0 +1,149 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, ToolCallPart, UserPromptPart
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.models.wrapper import WrapperModel
+
+from llm_cache import ResponseCacheModel
+from search_cache import SearchCache
+
+ANSWER = "I can search the web and inspect your Kubernetes cluster. " * 4
+
+
+class StoppingModel(WrapperModel):
+    """Reports "stop" at the end of a stream, as real providers do (FunctionModel reports nothing)"""
+
+    @asynccontextmanager
+    async def request_stream(self, messages, model_settings, model_request_parameters, run_context=None):
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            events = stream._get_event_iterator
+
+            async def finishing():
+                async for event in events():
+                    yield event
+                stream.finish_reason = "stop"
+
+            stream._get_event_iterator = finishing
+            yield stream
+
+
+def text_model(calls, finish_reason="stop"):
+    async def answer(messages, info):
+        calls.append("request")
+        return ModelResponse(parts=[TextPart(ANSWER)], finish_reason=finish_reason)
+
+    async def stream(messages, info):
+        calls.append("stream")
+        for start in range(0, len(ANSWER), 10):
+            yield ANSWER[start:start + 10]
+
+    return FunctionModel(answer, stream_function=stream, model_name="fake")
+
+
+def cached_agent(model):
+    cache_model = ResponseCacheModel(model, SearchCache(max_size=10, ttl=60))
+    return Agent(cache_model), cache_model
+
+
+def test_text_response_is_replayed():
+    calls = []
+    agent, cache_model = cached_agent(text_model(calls))
+
+    async def scenario():
+        first = await agent.run("What can you do?")
+        second = await agent.run("What can you do?")
+        assert first.output == second.output == ANSWER
+
+    asyncio.run(scenario())
+    assert calls == ["request"]
+    assert cache_model.stats()["hits"] == 1 and cache_model.stats()["stored"] == 1
+
+
+def test_response_without_stop_is_not_cached():
+    calls = []
+    agent, cache_model = cached_agent(text_model(calls, finish_reason="length"))
+
+    async def scenario():
+        for _ in range(2):
+            await agent.run("What can you do?")
+
+    asyncio.run(scenario())
+    assert calls == ["request", "request"]
+    assert cache_model.stats()["stored"] == 0 and cache_model.stats()["uncacheable"] == 2
+
+
+def test_streamed_response_is_replayed_as_a_stream():
+    calls = []
+    agent, cache_model = cached_agent(StoppingModel(text_model(calls)))
+
+    async def stream_once():
+        async with agent.run_stream("What can you do?") as result:
+            chunks = [chunk async for chunk in result.stream_text(delta=True, debounce_by=None)]
+        return chunks
+
+    async def scenario():
+        live = await stream_once()
+        replayed = await stream_once()
+        assert "".join(live) == "".join(replayed) == ANSWER
+        assert len(replayed) > 1
+
+    asyncio.run(scenario())
+    assert calls == ["stream"]
+    assert cache_model.stats()["hits"] == 1
+
+
+def test_stream_read_only_in_part_is_not_cached():
+    calls = []
+    cache_model = ResponseCacheModel(StoppingModel(text_model(calls)), SearchCache(max_size=10, ttl=60))
+    messages = [ModelRequest(parts=[UserPromptPart("What can you do?")])]
+
+    async def read(events: int):
+        async with cache_model.request_stream(messages, None, ModelRequestParameters()) as stream:
+            async for _ in stream:
+                events -= 1
+                if not events:
+                    break
+            return stream.get()
+
+    async def scenario():
+        partial = await read(events=2)
+        assert partial.parts[0].content != ANSWER
+        assert (await read(events=0)).parts[0].content == ANSWER
+        assert (await read(events=0)).parts[0].content == ANSWER
+
+    asyncio.run(scenario())
+    assert calls == ["stream", "stream"]
+    stats = cache_model.stats()
+    assert stats["uncacheable"] == 1 and stats["stored"] == 1 and stats["hits"] == 1
+
+
+def test_answer_after_tool_results_bypasses_the_cache():
+    calls = []
+
+    async def answer(messages, info):
+        calls.append(len(messages))
+        if len(messages) == 1:
+            return ModelResponse(parts=[ToolCallPart("pod_count", {})], finish_reason="tool_call")
+        return ModelResponse(parts=[TextPart("There are 3 pods.")], finish_reason="stop")
+
+    agent, cache_model = cached_agent(FunctionModel(answer, model_name="fake"))
+    pods = iter([3, 4])
+
+    @agent.tool_plain
+    def pod_count() -> int:
+        return next(pods)
+
+    async def scenario():
+        for _ in range(2):
+            assert (await agent.run("How many pods are running?")).output == "There are 3 pods."
+
+    asyncio.run(scenario())
+    # Neither the tool-calling response nor the answer after the tool result was served from the cache
+    assert calls == [1, 3, 1, 3]
+    stats = cache_model.stats()
+    assert stats["bypassed"] == 2 and stats["hits"] == 0 and stats["stored"] == 0
@@ -0,0 +1,58 @@
+import asyncio
+
+import httpx
+from openai import AsyncOpenAI
+
+from llm_http import LLMHttpClient
+
+
+def test_prewarm_sends_authenticated_requests_through_the_provider_client():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.host == "farm.example":
+            # Deployment URLs have no models route; the connection is warm all the same
+            return httpx.Response(404, json={"error": "not found"})
+        return httpx.Response(200, json={"object": "list", "data": []})
+
+    http = LLMHttpClient("OpenAI", transport=httpx.MockTransport(handler))
+    openai_client = AsyncOpenAI(api_key="sk-test", base_url="https://llm.example/v1", http_client=http.client)
+    farm_client = AsyncOpenAI(
+        api_key="dummy",
+        base_url="https://farm.example/deployments/gpt-4o/",
+        default_headers={"genaiplatform-farm-subscription-key": "farm-key"},
+        default_query={"api-version": "2024-08-01-preview"},
+        http_client=http.client,
+    )
+    # Two models on the same host share its connections
+    same_host = AsyncOpenAI(api_key="sk-test", base_url="https://llm.example/v1", http_client=http.client)
+
+    asyncio.run(http.prewarm([openai_client, farm_client, same_host], connections=2))
+
+    openai_requests = [r for r in requests if r.url.host == "llm.example"]
+    farm_requests = [r for r in requests if r.url.host == "farm.example"]
+    assert len(openai_requests) == 2 and len(farm_requests) == 2
+    assert all(r.method == "GET" and r.url.path == "/v1/models" for r in openai_requests)
+    assert all(r.headers["authorization"] == "Bearer sk-test" for r in openai_requests)
+    assert all(r.headers["genaiplatform-farm-subscription-key"] == "farm-key" for r in farm_requests)
+    assert all(r.url.params["api-version"] == "2024-08-01-preview" for r in farm_requests)
+    assert http.stats()["prewarmed"] == 4 and http.stats()["prewarm_failures"] == 0
+
+
+def test_prewarm_counts_closed_and_failed_connections():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "down.example":
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, headers={"connection": "close"}, json={"object": "list", "data": []})
+
+    http = LLMHttpClient("OpenAI", transport=httpx.MockTransport(handler))
+    clients = [
+        AsyncOpenAI(api_key="k", base_url=f"https://{host}/v1", http_client=http.client)
+        for host in ("closing.example", "down.example")
+    ]
+    asyncio.run(http.prewarm(clients, connections=1, timeout=1))
+    assert http.stats()["prewarmed"] == 0 and http.stats()["prewarm_failures"] == 2
+
+    asyncio.run(http.prewarm(clients, connections=0))
+    assert http.stats()["prewarm_failures"] == 2
@@ -0,0 +1,28 @@
+import asyncio
+
+from mcp_toolsets import CachedCatalogToolset
+
+
+def test_tools_list_changed_invalidates_catalog(fake_server):
+    async def scenario():
+        server = fake_server()
+        catalog = CachedCatalogToolset(server)
+        async with server:
+            tools = await catalog.get_tools(None)
+            assert "late_tool" not in tools
+            await catalog.get_tools(None)
+            assert catalog.hits == 1
+
+            await server.direct_call_tool("add_tool", {"name": "late_tool"})
+            for _ in range(100):
+                if catalog.invalidations:
+                    break
+                await asyncio.sleep(0.05)
+            # Fails if the mcp ClientSession no longer routes notifications through the hook
+            assert catalog.invalidations == 1
+
+            tools = await catalog.get_tools(None)
+            assert "late_tool" in tools
+            assert catalog.refreshes == 2
+
+    asyncio.run(scenario())
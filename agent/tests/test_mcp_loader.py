@@ -0,0 +1,30 @@
+import sys
+import asyncio
+
+from conftest import FAKE_SERVER
+from mcp_loader import build_mcp_server
+from mcp_toolsets import MCPSessionManager
+
+
+def slow_entry(**extra):
+    return {"command": sys.executable, "args": [str(FAKE_SERVER)], "env": {"FAKE_STARTUP_DELAY": "6"}, **extra}
+
+
+def test_handshake_timeout_follows_the_startup_timeout():
+    assert build_mcp_server("slow", slow_entry(), startup_timeout=30).timeout == 30
+    assert build_mcp_server("slow", slow_entry(startupTimeout=45), startup_timeout=30).timeout == 45
+    assert build_mcp_server("slow", slow_entry(timeout=7, startupTimeout=45), startup_timeout=30).timeout == 7
+
+
+def test_server_slower_than_five_seconds_to_initialize_starts():
+    async def scenario():
+        sessions = MCPSessionManager(startup_timeout=30)
+        sessions.add_server(build_mcp_server("slow", slow_entry(), startup_timeout=30))
+        await sessions.start()
+        try:
+            assert "slow" in sessions.running()
+            assert sessions.status["slow"]["startup_seconds"] >= 6
+        finally:
+            await sessions.stop()
+
+    asyncio.run(scenario())
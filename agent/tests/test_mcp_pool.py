@@ -0,0 +1,28 @@
+import asyncio
+
+from mcp_pool import StdioServerPool
+from mcp_toolsets import MCPSessionManager
+
+
+async def server_pid(server) -> int:
+    result = await server.direct_call_tool("pid", {})
+    return int(result["result"] if isinstance(result, dict) else result)
+
+
+def test_concurrent_starts_get_their_own_pids(fake_server):
+    async def scenario():
+        pool = StdioServerPool("pooled", lambda: fake_server("pooled"), size=3)
+        sessions = MCPSessionManager([fake_server("a"), fake_server("b")])
+        # Pool workers and plain stdio servers spawn at the same time
+        await asyncio.gather(pool.__aenter__(), sessions.start())
+        try:
+            workers = pool.workers + [sessions.session("a"), sessions.session("b")]
+            assert len(workers) == 5
+            for worker in workers:
+                assert worker.pid == await server_pid(worker.server)
+            assert len({worker.pid for worker in workers}) == 5
+        finally:
+            await sessions.stop()
+            await pool.__aexit__(None, None, None)
+
+    asyncio.run(scenario())
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import asyncio
+
+from pydantic_ai import RunContext
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.usage import RunUsage
+
+from conftest import FAKE_SERVER
+from mcp_loader import build_mcp_server
+from mcp_reload import MCPConfigReloader
+from mcp_toolsets import CachedCatalogToolset, ManagedSessionToolset, MCPSessionManager, SwappableToolset
+
+
+def server_entry(generation: str):
+    return {"command": sys.executable, "args": [str(FAKE_SERVER)], "env": {"GENERATION": generation}}
+
+
+def write_config(path, servers):
+    path.write_text(json.dumps({"mcpServers": servers}))
+
+
+async def call(registry: SwappableToolset, name: str) -> int:
+    ctx = RunContext(deps=None, model=TestModel(), usage=RunUsage())
+    tools = await registry.get_tools(ctx)
+    result = await registry.call_tool(name, {}, ctx, tools[name])
+    return int(result["result"] if isinstance(result, dict) else result)
+
+
+async def exited(pid: int) -> bool:
+    for _ in range(100):
+        if not os.path.exists(f"/proc/{pid}"):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+def test_reload_keeps_in_flight_runs_on_their_servers(tmp_path):
+    path = tmp_path / "mcp_config.json"
+    configs = {"fake": server_entry("1"), "gone": server_entry("1")}
+    write_config(path, configs)
+
+    async def scenario():
+        sessions = MCPSessionManager()
+
+        def build(name, config):
+            server = build_mcp_server(name, config)
+            sessions.add_server(server)
+            return ManagedSessionToolset(CachedCatalogToolset(server), sessions=sessions)
+
+        toolsets = {name: build(name, config) for name, config in configs.items()}
+        registry = SwappableToolset(list(toolsets.values()))
+        reloader = MCPConfigReloader(str(path), configs, toolsets, registry, sessions, build,
+                                     forget=lambda name: None, interval=0, drain_timeout=30)
+        await sessions.start()
+
+        in_run, reloaded = asyncio.Event(), asyncio.Event()
+
+        async def run():
+            async with registry:
+                pids = await call(registry, "fake_pid"), await call(registry, "gone_pid")
+                in_run.set()
+                await reloaded.wait()
+                # Still on the servers the run started with: removed and replaced ones included
+                assert {"fake_pid", "gone_pid"} <= set(await registry.get_tools(None))
+                assert (await call(registry, "fake_pid"), await call(registry, "gone_pid")) == pids
+                return pids
+
+        try:
+            task = asyncio.create_task(run())
+            await asyncio.wait([task, asyncio.create_task(in_run.wait())], return_when=asyncio.FIRST_COMPLETED)
+            assert in_run.is_set(), task.exception()
+            # "fake" is changed (restarted with a new config), "gone" is removed
+            write_config(path, {"fake": server_entry("2")})
+            await reloader.reload()
+            reloaded.set()
+            old_fake, old_gone = await task
+
+            await asyncio.gather(*reloader._drains)
+            assert await exited(old_fake) and await exited(old_gone)
+
+            async with registry:
+                assert "gone_pid" not in await registry.get_tools(None)
+                new_fake = await call(registry, "fake_pid")
+            assert new_fake != old_fake
+            assert sessions.session("fake").pid == new_fake
+        finally:
+            await reloader.stop()
+            await sessions.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=120))
@@ -0,0 +1,58 @@
+import asyncio
+
+from mcp_result_cache import ToolResultCache
+from mcp_toolsets import ResultCacheToolset
+
+
+class SlowToolset:
+    """Stands in for an MCP toolset: answers after a per-call delay and counts calls"""
+
+    def __init__(self):
+        self.calls = []
+        self.delays = {}
+
+    async def call_tool(self, name, tool_args, ctx, tool):
+        self.calls.append(name)
+        await asyncio.sleep(self.delays.get(name, 0))
+        return f"{name} result {len(self.calls)}"
+
+
+def test_write_patterns_match_verbs_not_resource_names():
+    cache = ToolResultCache("k8s", read_only=["kubectl_get"], tool_prefix="k8s")
+    for tool in ("k8s_kubectl_get", "k8s_describe_statefulset", "k8s_list_daemonsets", "k8s_replicaset_status"):
+        assert not cache.is_write(tool), tool
+    for tool in ("k8s_kubectl_apply", "k8s_set_image", "k8s_kubectl_set", "k8s_kubectl_context", "k8s_kubectl_delete"):
+        assert cache.is_write(tool), tool
+
+
+def test_context_switch_invalidates_every_cached_read():
+    cache = ToolResultCache("k8s", read_only=["kubectl_get"])
+    cache.set("kubectl_get", {"resourceType": "pods", "namespace": "default"}, "pods")
+    cache.set("kubectl_get", {"resourceType": "nodes"}, "nodes")
+    assert cache.is_write("kubectl_context")
+    assert cache.invalidate_for_write("kubectl_context", {"operation": "set", "name": "prod"}) == 2
+    assert cache.get("kubectl_get", {"resourceType": "nodes"}) == (False, None)
+
+
+def test_read_overlapping_a_write_is_not_cached():
+    wrapped = SlowToolset()
+    wrapped.delays = {"kubectl_get": 0.1}
+    cache = ToolResultCache("k8s", read_only=["kubectl_get"])
+    toolset = ResultCacheToolset(wrapped, cache=cache)
+    read_args = {"resourceType": "pods", "namespace": "default"}
+
+    async def scenario():
+        read = asyncio.create_task(toolset.call_tool("kubectl_get", read_args, None, None))
+        await asyncio.sleep(0.01)
+        # The write finishes while the read is still waiting for its (pre-write) answer
+        await toolset.call_tool("kubectl_delete", {"resourceType": "pod", "namespace": "default"}, None, None)
+        await read
+        assert cache.get("kubectl_get", read_args) == (False, None)
+
+        # Without an overlapping write the next read is cached as usual
+        await toolset.call_tool("kubectl_get", read_args, None, None)
+        await toolset.call_tool("kubectl_get", read_args, None, None)
+
+    asyncio.run(scenario())
+    assert wrapped.calls == ["kubectl_get", "kubectl_delete", "kubectl_get"]
+    assert cache.stats()["stale_discarded"] == 1 and cache.stats()["hits"] == 1
@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+
+from pydantic_ai import RunContext
+from pydantic_ai.mcp import MCPServerStdio
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.usage import RunUsage
+
+from mcp_supervisor import MCPSupervisor
+from mcp_toolsets import CachedCatalogToolset, ManagedSessionToolset, MCPSessionManager
+
+
+async def wait_until_restart_due(supervisor: MCPSupervisor, name: str):
+    await asyncio.sleep(max(supervisor.health[name].next_restart_at - time.monotonic(), 0) + 0.01)
+
+
+def test_killed_server_is_restarted(fake_server):
+    async def scenario():
+        sessions = MCPSessionManager([fake_server()])
+        supervisor = MCPSupervisor(sessions, interval=0, probe_timeout=2, failure_threshold=1, backoff=0.1)
+        await sessions.start()
+        try:
+            old_pid = sessions.session("fake").pid
+            await supervisor.check("fake")
+            assert supervisor.stats()["fake"]["healthy"]
+
+            os.kill(old_pid, signal.SIGKILL)
+            await asyncio.sleep(0.2)
+            await supervisor.check("fake")
+            stats = supervisor.stats()["fake"]
+            assert not stats["healthy"] and stats["probe_failures"] == 1
+            assert not sessions.available("fake")
+
+            await wait_until_restart_due(supervisor, "fake")
+            await supervisor.check("fake")
+            stats = supervisor.stats()["fake"]
+            assert stats["healthy"] and stats["restarts"] == 1
+            assert sessions.available("fake")
+            assert sessions.session("fake").pid not in (None, old_pid)
+        finally:
+            await sessions.stop()
+
+    asyncio.run(scenario())
+
+
+def test_hung_server_is_detected_and_restarted(fake_server):
+    async def scenario():
+        sessions = MCPSessionManager([fake_server()])
+        supervisor = MCPSupervisor(sessions, interval=0, probe_timeout=0.5, failure_threshold=2, backoff=0.1)
+        await sessions.start()
+        try:
+            pid = sessions.session("fake").pid
+            os.kill(pid, signal.SIGSTOP)
+            await supervisor.check("fake")
+            # One missed ping is tolerated below the failure threshold
+            assert supervisor.stats()["fake"]["healthy"]
+            await supervisor.check("fake")
+            stats = supervisor.stats()["fake"]
+            assert not stats["healthy"] and stats["probe_failures"] == 2
+            assert "TimeoutError" in stats["last_error"]
+
+            await wait_until_restart_due(supervisor, "fake")
+            await supervisor.check("fake")
+            assert supervisor.stats()["fake"]["healthy"]
+            assert sessions.session("fake").pid != pid
+        finally:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await sessions.stop()
+
+    asyncio.run(scenario())
+
+
+def test_restart_fails_the_call_in_flight_on_a_hung_server(fake_server):
+    async def scenario():
+        server = fake_server()
+        sessions = MCPSessionManager([server])
+        supervisor = MCPSupervisor(sessions, interval=0, probe_timeout=0.5, failure_threshold=1, backoff=0.1)
+        toolset = ManagedSessionToolset(CachedCatalogToolset(server), sessions=sessions)
+        ctx = RunContext(deps=None, model=TestModel(), usage=RunUsage())
+        await sessions.start()
+        pid = sessions.session("fake").pid
+        try:
+            tools = await toolset.get_tools(ctx)
+            slow = asyncio.create_task(toolset.call_tool("sleep", {"seconds": 60}, ctx, tools["sleep"]))
+            await asyncio.sleep(0.5)
+            os.kill(pid, signal.SIGSTOP)
+            await supervisor.check("fake")
+            assert not supervisor.stats()["fake"]["healthy"]
+
+            await wait_until_restart_due(supervisor, "fake")
+            start = time.monotonic()
+            await supervisor.check("fake")
+            assert supervisor.stats()["fake"]["healthy"]
+            assert sessions.session("fake").pid not in (None, pid)
+            assert not os.path.exists(f"/proc/{pid}")
+            # The pending call failed instead of holding the hung session open
+            result = await asyncio.wait_for(slow, timeout=1)
+            assert result["transient"] and "restarted" in result["error"]
+            assert time.monotonic() - start < 10
+
+            tools = await toolset.get_tools(ctx)
+            new_pid = await toolset.call_tool("pid", {}, ctx, tools["pid"])
+            assert int(new_pid) == sessions.session("fake").pid
+        finally:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await sessions.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_restarts_back_off(fake_server):
+    async def scenario():
+        good = fake_server()
+        sessions = MCPSessionManager([good])
+        supervisor = MCPSupervisor(sessions, interval=0, probe_timeout=2, failure_threshold=1,
+                                   backoff=0.1, max_backoff=0.3)
+        await sessions.start()
+        try:
+            # The server now fails to start, as a broken binary would
+            sessions.servers["fake"] = MCPServerStdio(sys.executable, ["-c", "raise SystemExit(1)"], id="fake")
+            os.kill(sessions.session("fake").pid, signal.SIGKILL)
+            await asyncio.sleep(0.2)
+            await supervisor.check("fake")
+            assert supervisor.health["fake"].backoff == 0.1
+
+            backoffs = []
+            for _ in range(3):
+                await wait_until_restart_due(supervisor, "fake")
+                await supervisor.check("fake")
+                backoffs.append(supervisor.health["fake"].backoff)
+            assert backoffs == [0.2, 0.3, 0.3]
+            stats = supervisor.stats()["fake"]
+            assert not stats["healthy"] and stats["restart_failures"] == 3 and stats["restarts"] == 0
+
+            sessions.servers["fake"] = good
+            await wait_until_restart_due(supervisor, "fake")
+            await supervisor.check("fake")
+            stats = supervisor.stats()["fake"]
+            assert stats["healthy"] and stats["restarts"] == 1
+            assert supervisor.health["fake"].backoff == 0.1
+        finally:
+            await sessions.stop()
+
+    asyncio.run(scenario())
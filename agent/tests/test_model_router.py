@@ -0,0 +1,78 @@
+import asyncio
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelRequest, ModelResponse, RetryPromptPart, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart,
+)
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.models.test import TestModel
+
+from model_router import ModelRouter
+
+
+def router(**kwargs) -> ModelRouter:
+    return ModelRouter(TestModel(), TestModel(), **kwargs)
+
+
+def prompt(text: str):
+    return [ModelRequest(parts=[UserPromptPart(text)])]
+
+
+def after_tool(text: str, result: str):
+    return [
+        *prompt(text),
+        ModelResponse(parts=[ToolCallPart("kubectl_get", {"resourceType": "pods"}, tool_call_id="1")]),
+        ModelRequest(parts=[ToolReturnPart("kubectl_get", result, tool_call_id="1")]),
+    ]
+
+
+def test_short_prompt_stays_on_the_fast_tier():
+    assert router().classify(prompt("list pods in default")) == ("fast", "short prompt", "")
+
+
+def test_synthesis_prompt_goes_to_the_strong_tier_right_away():
+    assert router().classify(prompt("Explain CrashLoopBackOff in detail")) == ("strong", "synthesis request", "")
+    # Keywords match whole words only
+    assert router().classify(prompt("show the whyzard deployment"))[0] == "fast"
+
+
+def test_long_prompt_goes_to_the_strong_tier():
+    tier, reason, detail = router(long_prompt_chars=100).classify(prompt("x " * 60))
+    assert (tier, reason, detail) == ("strong", "long prompt", "120 chars")
+
+
+def test_requests_after_tools_escalate_for_large_results_or_synthesis():
+    small = "pod-1 Running"
+    assert router().classify(after_tool("list pods", small)) == ("fast", "small tool results", "13 chars")
+    assert router(synthesis_chars=100).classify(after_tool("list pods", "x" * 200))[:2] == ("strong", "large tool results")
+    assert router().classify(after_tool("why is pod-1 failing?", small))[:2] == ("strong", "synthesis request after tools")
+
+
+def test_argument_retries_stay_on_the_fast_tier():
+    messages = [
+        *prompt("Explain the failing pods"),
+        ModelResponse(parts=[ToolCallPart("kubectl_get", {}, tool_call_id="1")]),
+        ModelRequest(parts=[RetryPromptPart("resourceType is required", tool_name="kubectl_get", tool_call_id="1")]),
+    ]
+    assert router().classify(messages) == ("fast", "argument retry", "")
+
+
+def test_requests_reach_the_chosen_model():
+    seen = []
+
+    def tier(name):
+        def answer(messages, info):
+            seen.append(name)
+            return ModelResponse(parts=[TextPart(f"{name} answer")])
+        return FunctionModel(answer, model_name=name)
+
+    model = ModelRouter(tier("fast"), tier("strong"))
+    agent = Agent(model)
+
+    async def scenario():
+        assert (await agent.run("list pods")).output == "fast answer"
+        assert (await agent.run("explain CrashLoopBackOff in detail")).output == "strong answer"
+
+    asyncio.run(scenario())
+    assert seen == ["fast", "strong"]
+    assert model.stats()["tiers"]["strong"]["reasons"] == {"synthesis request": 1}
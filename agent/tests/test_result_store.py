@@ -0,0 +1,72 @@
+import json
+import asyncio
+
+from mcp_toolsets import LargeResultToolset
+from result_store import ResultStore, query_result, summarize
+
+
+class StaticToolset:
+    """Stands in for an MCP toolset that returns a fixed result"""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def call_tool(self, name, tool_args, ctx, tool):
+        return self.result
+
+
+def test_summary_of_huge_lines_is_capped():
+    single = summarize("x" * 500_000, preview_chars=1500)
+    assert len(single["header"]) <= 1503 and single["preview"] == []
+
+    lines = "\n".join(["NAME READY STATUS"] + ["pod " + "y" * 100_000] * 5)
+    summary = summarize(lines, preview_chars=1500)
+    assert summary["total_items"] == 6 and summary["header"] == "NAME READY STATUS"
+    assert len(json.dumps(summary)) < 2000
+
+
+def test_summary_of_json_lists_is_capped():
+    items = [{"metadata": {"name": f"pod-{i}"}, "spec": "z" * 10_000} for i in range(10)]
+    summary = summarize({"items": items}, preview_chars=1500)
+    assert summary["items_key"] == "items" and summary["fields"] == ["metadata", "spec"]
+    assert len(summary["preview"]) <= 1503
+
+
+def test_spilled_results_round_trip(tmp_path):
+    store = ResultStore(max_memory_bytes=1000, spill_dir=str(tmp_path), max_disk_bytes=2500)
+
+    async def scenario():
+        first = await store.put("a" * 900, page_chars=100)
+        second = await store.put("b" * 900)
+        assert store.stats()["spilled"] == 1 and (tmp_path / f"{first}.txt").exists()
+        assert await store.get(first) == ("a" * 900, 100)
+        assert await store.get(second) == ("b" * 900, None)
+
+        # Disk holds two spilled results; a third spill evicts the oldest file
+        await store.put("c" * 900)
+        await store.put("d" * 900)
+        assert await store.get(first) is None
+        assert not (tmp_path / f"{first}.txt").exists()
+        assert await store.get("res_unknown") is None
+
+    asyncio.run(scenario())
+    stats = store.stats()
+    assert stats["disk_entries"] == 2 and stats["disk_bytes"] == 1800 and stats["evicted"] == 1
+
+
+def test_large_results_are_paged_with_the_servers_limit():
+    rows = "\n".join(["NAME STATUS"] + [f"pod-{i} Running" for i in range(1000)])
+    store = ResultStore()
+    toolset = LargeResultToolset(StaticToolset(rows), store=store, max_chars=500)
+
+    async def scenario():
+        summary = await toolset.call_tool("kubectl_get", {}, None, None)
+        assert summary["total_items"] == 1001 and summary["header"] == "NAME STATUS"
+        text, page_chars = await store.get(summary["handle"])
+        assert page_chars == 500
+        page = query_result(text, max_chars=page_chars)
+        assert page["header"] == "NAME STATUS" and page["matched"] == 1000
+        assert sum(len(item) + 2 for item in page["items"]) <= 500 and page["next_offset"]
+
+    asyncio.run(scenario())
+    assert toolset.stats()["offloaded"] == 1
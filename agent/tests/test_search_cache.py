@@ -0,0 +1,134 @@
+import time
+import asyncio
+
+import pytest
+
+from search_cache import SearchCache, normalize_query
+from search_store import SearchStore
+from singleflight import SingleFlight
+
+
+def test_queries_are_normalized():
+    assert normalize_query("  What's   NEW in K8s? ") == normalize_query("what s new in k8s")
+
+    cache = SearchCache(max_size=4, ttl=60)
+    cache.set("Kubernetes 1.31 release notes!", "notes")
+    assert cache.get("kubernetes 1.31   release notes") == "notes"
+
+
+def test_expired_entries_are_misses():
+    cache = SearchCache(max_size=4, ttl=60)
+    cache.set("short", "value", ttl=0.05)
+    cache.set("long", "value")
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    assert cache.get("long") == "value"
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = SearchCache(max_size=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_store_round_trip_expiry_and_compaction(tmp_path):
+    path = str(tmp_path / "cache" / "search.db")
+    store = SearchStore(path, ttl=60, max_entries=2, compact_every=1000)
+
+    async def scenario():
+        await store.set("a", "payload-a")
+        await store.set("b", "payload-b", ttl=0.05)
+        assert await store.get("a") == "payload-a"
+        await asyncio.sleep(0.1)
+        assert await store.get("b") is None
+
+    asyncio.run(scenario())
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+    # Another process (here: another instance) sees the same rows
+    other = SearchStore(path, ttl=60, max_entries=2)
+    assert other.get_sync("a") == "payload-a"
+
+    for key in ("c", "d", "e"):
+        store.set_sync(key, key)
+        time.sleep(0.01)
+    # The expired "b", then the least recently used rows beyond max_entries ("a", "c")
+    assert store.compact_sync() == 3
+    assert store.get_sync("a") is None
+    assert store.get_sync("c") is None
+    assert store.get_sync("e") == "e"
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("query", fetch) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["result"] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "followers": 4}
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("q", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await flight.do("q", failing)
+
+    asyncio.run(scenario())
+    assert calls == 2
+
+
+def test_cancelling_the_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def scenario():
+        upstream_started = asyncio.Event()
+
+        async def fetch():
+            upstream_started.set()
+            await asyncio.sleep(0.1)
+            return "result"
+
+        leader = asyncio.create_task(flight.do("q", fetch))
+        await upstream_started.wait()
+        follower = asyncio.create_task(flight.do("q", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "result"
+        assert leader.cancelled()
+
+    asyncio.run(scenario())
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,175 @@
+import time
+import asyncio
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from bm25 import BM25, tokenize
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from hedging import Hedger
+from limits import ConcurrencyLimiter, OverloadedError, TokenBucket
+from passage_extraction import PassageExtractor, chunk_text
+from search_compaction import SearchCompactor, estimate_tokens, result_tokens, trim_to_sentences
+
+
+class Result(BaseModel):
+    title: str
+    url: str
+    content: str
+    score: float
+    passages: List[str] = []
+
+
+def test_bm25_ranks_matching_documents_first():
+    docs = ["pods crash with crashloopbackoff", "helm chart install guide", "list pods in a namespace"]
+    index = BM25([tokenize(doc) for doc in docs])
+    scores = index.scores(tokenize("why do pods crash"))
+    assert scores[0] > scores[2] > scores[1] == 0.0
+
+
+def test_trim_to_sentences_respects_the_budget():
+    text = "First sentence here. Second sentence is a little longer. Third one."
+    assert trim_to_sentences(text, 100) == text
+    assert trim_to_sentences(text, 6) == "First sentence here."
+    assert trim_to_sentences(text, 0) == ""
+    cut = trim_to_sentences("word " * 200, 10)
+    assert cut.endswith("…") and estimate_tokens(cut) <= 10
+
+
+def test_compaction_dedupes_ranks_and_fits_the_budget():
+    snippet = "Kubernetes pods restart when the liveness probe fails repeatedly. " * 10
+    results = [
+        Result(title="low", url="https://a", content="Unrelated text about charts. " * 40, score=0.2),
+        Result(title="top", url="https://b", content=snippet, score=0.9),
+        Result(title="dup", url="https://c", content=snippet, score=0.8),
+        Result(title="mid", url="https://d", content="Short answer.", score=0.5,
+               passages=["A long passage. " * 100, "Another passage. " * 100]),
+    ]
+    compactor = SearchCompactor(token_budget=200)
+    compacted, saved = compactor.compact(results)
+
+    assert [r.title for r in compacted] == ["top", "mid", "low"]
+    assert sum(result_tokens(r) for r in compacted) <= 200
+    assert saved > 0 and compactor.stats()["duplicates_dropped"] == 1
+    assert all(r.url for r in compacted)
+
+
+def test_passages_are_ranked_across_pages():
+    pages = [
+        "Intro about clouds. " * 5 + "\n\nTo drain a node run kubectl drain with ignore daemonsets.",
+        "Nothing relevant here at all. " * 5,
+    ]
+    assert len(chunk_text("One. Two. Three.", chunk_words=1)) == 3
+    passages = PassageExtractor(passages_per_result=1).extract("how to drain a node with kubectl", pages)
+    assert "kubectl drain" in passages[0][0]
+    assert passages[1] == []
+
+
+def test_concurrency_limiter_rejects_when_the_queue_is_full():
+    limiter = ConcurrencyLimiter("tavily", max_concurrency=1, max_queue=1, max_wait=5)
+    release = None
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        running = asyncio.create_task(hold())
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        assert limiter.in_flight == 1 and limiter.queued == 1
+        with pytest.raises(OverloadedError):
+            async with limiter.slot():
+                pass
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(scenario())
+    assert limiter.stats()["rejected"] == 1 and limiter.in_flight == 0
+
+
+def test_token_bucket_throttles_then_rejects():
+    bucket = TokenBucket("tavily", rate=20, capacity=1, max_wait=0.08)
+
+    async def scenario():
+        await bucket.acquire()  # the burst token
+        start = time.monotonic()
+        # The first caller waits ~1/20s for the next token, the second would wait twice that
+        first, second = await asyncio.gather(bucket.acquire(), bucket.acquire(), return_exceptions=True)
+        assert first is None and isinstance(second, OverloadedError)
+        assert time.monotonic() - start >= 0.04
+
+    asyncio.run(scenario())
+    assert bucket.throttled == 1 and bucket.rejected == 1
+
+
+def test_hedged_call_wins_over_a_slow_primary():
+    hedger = Hedger(min_samples=1, min_delay=0.02)
+    hedger.latency.record(0.02)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(1.0 if attempts == 1 else 0.01)
+        return attempts
+
+    async def scenario():
+        start = time.monotonic()
+        assert await hedger.run(call) == 2
+        assert time.monotonic() - start < 0.5
+
+    asyncio.run(scenario())
+    assert hedger.hedged == 1 and hedger.hedge_wins == 1
+
+
+def test_breaker_opens_then_half_opens_and_closes():
+    breaker = CircuitBreaker("tavily", failure_rate_threshold=0.5, min_calls=2, window=4, cooldown=0.05)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return "ok"
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.call(fail)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as info:
+            await breaker.call(ok)
+        assert info.value.to_dict()["retry_after"] <= 0.05
+
+        await asyncio.sleep(0.06)
+        breaker.allow()  # the probe
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()  # only one probe at a time
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert await breaker.call(ok) == "ok"
+
+    asyncio.run(scenario())
+    assert breaker.stats()["times_opened"] == 1 and breaker.stats()["short_circuited"] == 2
+
+
+def test_failed_probe_reopens_and_cancellation_is_not_a_failure():
+    breaker = CircuitBreaker("mcp", min_calls=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.times_opened == 2
+
+    closed = CircuitBreaker("mcp", min_calls=1)
+
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(closed.call(cancelled))
+    assert closed.state == CLOSED and closed.failure_rate() == 0.0